@@ -0,0 +1,228 @@
+# Escáner masivo de claves RSA débiles mediante el MCD por lotes de Bernstein.
+# Si dos claves comparten un primo p, mcd(N1, N2) = p las rompe a ambas, pero probar todos los pares con mcd
+# cuesta O(n^2). En cambio, con un árbol de productos calculamos P = N_1 * N_2 * ... * N_n, y con un árbol de
+# restos bajamos P mod N_i^2 hasta cada hoja; como N_i divide a P, (P mod N_i^2) / N_i = (P / N_i) mod N_i,
+# así que mcd((P mod N_i^2) / N_i, N_i) es el mcd de N_i con el producto de todas las demás claves.
+# Cada nivel de los árboles se guarda en disco y se procesa en streaming, para que la memoria no dependa de
+# la cantidad de claves (salvo los nodos de más arriba, que son inevitablemente grandes).
+# Los restos no se calculan con el % de Python, que divide en tiempo cuadrático en la cantidad de bits y haría que el
+# árbol de restos cueste lo mismo que probar todos los pares: se usa gmpy2 (GMP) si está instalado, y si no, la
+# reducción de Barrett con un recíproco calculado por el método de Newton, que sólo multiplica (Karatsuba).
+import argparse
+import hashlib
+import math
+import os
+import struct
+import tempfile
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+from rsa import get_modular_inverse
+
+EXPONENTE_POR_DEFECTO = 65537
+# Tipo con el que se opera en los árboles: los enteros de GMP si están, los de Python si no
+ENTERO = int if gmpy2 is None else gmpy2.mpz
+# Por debajo de esta cantidad de bits del cociente, el % de Python es más rápido que Newton y Barrett
+BITS_DIVISION_DIRECTA = 2**16
+
+def escribir_entero(archivo, x):
+    ''' Guarda x en binario, precedido por su largo en bytes (así evitamos convertir números gigantes a texto).'''
+    x = int(x) # Los mpz de gmpy2 se convierten en tiempo lineal
+    datos = x.to_bytes((x.bit_length() + 7) // 8, 'big')
+    archivo.write(struct.pack('>Q', len(datos)))
+    archivo.write(datos)
+
+def leer_enteros(ruta):
+    ''' Generador que lee uno a uno los enteros guardados con escribir_entero.'''
+    with open(ruta, 'rb') as archivo:
+        while True:
+            largo = archivo.read(8)
+            if not largo:
+                return
+            yield int.from_bytes(archivo.read(struct.unpack('>Q', largo)[0]), 'big')
+
+def leer_claves(ruta):
+    '''
+    Generador de pares (N, E) leídos de un archivo de texto con una clave por línea, en formato "N" o "N E",
+    en decimal o hexadecimal con prefijo 0x. Las líneas vacías y las que empiezan con # se ignoran.
+    '''
+    with open(ruta) as archivo:
+        for linea in archivo:
+            partes = linea.split()
+            if not partes or partes[0].startswith('#'):
+                continue
+            exponente = int(partes[1], 0) if len(partes) > 1 else EXPONENTE_POR_DEFECTO
+            yield int(partes[0], 0), exponente
+
+def reciproco(m, precision):
+    '''
+    Aproximación de 2^(k + precision) / m, con k = bits de m, con error de unas pocas unidades. Se calcula el recíproco
+    de los bits más altos de m con la mitad de la precisión (más unos bits de guarda), y un paso de Newton
+    x <- 2x - m * x^2 / 2^(k + precision) duplica la cantidad de bits correctos.
+    '''
+    k = m.bit_length()
+    if precision <= BITS_DIVISION_DIRECTA:
+        return (1 << (k + precision)) // m
+    mitad = precision // 2 + 8
+    corrimiento = max(0, k - mitad - 8)
+    x = reciproco(m >> corrimiento, mitad) << (precision - mitad)
+    return 2 * x - ((m * x * x) >> (k + precision))
+
+def resto(a, m):
+    ''' a mod m para a >= 0, en tiempo subcuadrático (ver el comentario del principio).'''
+    if gmpy2 is not None:
+        return gmpy2.mpz(a) % m
+    bits = a.bit_length()
+    precision = bits - m.bit_length()
+    if precision <= BITS_DIVISION_DIRECTA:
+        return a % m
+    # Barrett: q = a * (2^bits / m) / 2^bits difiere del cociente en pocas unidades, que se corrigen al final
+    r = a - ((a * reciproco(m, precision)) >> bits) * m
+    while r < 0:
+        r += m
+    while r >= m:
+        r -= m
+    return r
+
+def arbol_de_productos(ruta_hojas, directorio):
+    '''
+    Construye el árbol de productos nivel por nivel: cada nodo es el producto de sus dos hijos (si la cantidad es
+    impar, el último sube sin pareja). Retorna la lista de rutas de los niveles, de las hojas a la raíz.
+    '''
+    niveles = [ruta_hojas]
+    cantidad = sum(1 for _ in leer_enteros(ruta_hojas))
+    while cantidad > 1:
+        ruta = os.path.join(directorio, f'productos_{len(niveles)}.bin')
+        with open(ruta, 'wb') as salida:
+            pendiente = None
+            for x in map(ENTERO, leer_enteros(niveles[-1])):
+                if pendiente is None:
+                    pendiente = x
+                else:
+                    escribir_entero(salida, pendiente * x)
+                    pendiente = None
+            if pendiente is not None:
+                escribir_entero(salida, pendiente)
+        niveles.append(ruta)
+        cantidad = (cantidad + 1) // 2
+    return niveles
+
+def arbol_de_restos(niveles, directorio):
+    '''
+    Baja desde la raíz calculando, para cada nodo, el resto del padre módulo el cuadrado del nodo. Como cada padre
+    tiene dos hijos consecutivos en el nivel de abajo, basta con leer ambos niveles en paralelo. Cada nivel de restos
+    reemplaza al anterior en disco, y retorna la ruta de los restos de las hojas.
+    '''
+    ruta_padres = niveles[-1] # La raíz es su propio resto
+    for nivel in range(len(niveles) - 2, -1, -1):
+        ruta = os.path.join(directorio, f'restos_{nivel}.bin')
+        padres = map(ENTERO, leer_enteros(ruta_padres))
+        with open(ruta, 'wb') as salida:
+            for j, nodo in enumerate(map(ENTERO, leer_enteros(niveles[nivel]))):
+                if j % 2 == 0:
+                    padre = next(padres)
+                escribir_entero(salida, resto(padre, nodo * nodo))
+        if ruta_padres != niveles[-1]:
+            os.remove(ruta_padres)
+        ruta_padres = ruta
+    return ruta_padres
+
+def claves_debiles(ruta_claves, directorio=None):
+    '''
+    Generador con todas las claves del archivo que comparten un primo con alguna otra, como tuplas
+    (índice, N, E, p, q, d, iguales), donde d es la private key recuperada con get_modular_inverse e iguales es la
+    lista de índices de las otras claves con exactamente el mismo N.
+    Las claves repetidas se separan antes de armar los árboles, con una pasada que guarda un hash de cada N: el MCD por
+    lotes corre sólo sobre los módulos distintos, y al final cada resultado se reporta también para sus repetidas. Una
+    clave repetida que no comparte primos con ninguna otra se reporta con p, q y d en None.
+    Si el mcd resulta ser N completo, la clave comparte cada uno de sus primos con alguna otra clave (no
+    necesariamente la misma). Esas claves, que normalmente son muy pocas, se resuelven con una pasada más por las
+    hojas, calculando el mcd de cada una con todos los módulos hasta que alguno comparta un solo primo.
+    Los exponentes también se guardan en disco junto a las hojas, así que la memoria sólo depende de la cantidad de
+    claves por el diccionario de hashes y por las repetidas.
+    '''
+    with tempfile.TemporaryDirectory(dir=directorio) as temporal:
+        ruta_hojas = os.path.join(temporal, 'productos_0.bin')
+        ruta_exponentes = os.path.join(temporal, 'exponentes.bin')
+        ruta_indices = os.path.join(temporal, 'indices.bin')
+        primeros = {} # hash de N -> índice de la primera clave con ese N
+        repetidas = {} # índice de la primera clave -> [(índice, E), ...] de las demás con el mismo N
+        cantidad = 0
+        with open(ruta_hojas, 'wb') as hojas, open(ruta_exponentes, 'wb') as exponentes, \
+                open(ruta_indices, 'wb') as indices:
+            for indice, (N, E) in enumerate(leer_claves(ruta_claves)):
+                huella = hashlib.blake2b(N.to_bytes((N.bit_length() + 7) // 8, 'big'), digest_size=16).digest()
+                primero = primeros.setdefault(huella, indice)
+                if primero != indice:
+                    repetidas.setdefault(primero, []).append((indice, E))
+                    continue
+                escribir_entero(hojas, N)
+                escribir_entero(exponentes, E)
+                escribir_entero(indices, indice)
+                cantidad += 1
+        del primeros
+
+        restos = None # Con menos de dos módulos distintos no hay nada que comparar
+        if cantidad >= 2:
+            niveles = arbol_de_productos(ruta_hojas, temporal)
+            restos = leer_enteros(arbol_de_restos(niveles, temporal))
+
+        completas = [] # (índice, N, E) de las claves cuyo mcd con el resto es N entero
+        claves = zip(leer_enteros(ruta_indices), leer_enteros(ruta_hojas), leer_enteros(ruta_exponentes))
+        for indice, N, E in claves:
+            g = math.gcd(next(restos) // N, N) if restos is not None else 1
+            if g == N:
+                completas.append((indice, N, E))
+            elif g != 1 or indice in repetidas:
+                yield from con_repetidas(indice, N, E, g if g != 1 else None, repetidas)
+
+        # Una sola pasada más por las hojas para todas las claves completas
+        factores = {indice: None for indice, _, _ in completas}
+        if completas:
+            for otro_N in leer_enteros(ruta_hojas):
+                for indice, N, _ in completas:
+                    if factores[indice] is None and otro_N != N:
+                        g = math.gcd(N, otro_N)
+                        if g != 1:
+                            factores[indice] = g
+        for indice, N, E in completas:
+            yield from con_repetidas(indice, N, E, factores[indice], repetidas)
+
+def con_repetidas(indice, N, E, p, repetidas):
+    '''
+    Genera el resultado de la clave indice y de las que repiten su N, cada una con su propio E. Con un factor p se
+    recupera la clave (ver recuperar_clave); sin él, p, q y d quedan en None.
+    '''
+    grupo = [(indice, E)] + repetidas.get(indice, [])
+    for i, E_i in grupo:
+        iguales = [j for j, _ in grupo if j != i]
+        if p is None:
+            yield i, N, E_i, None, None, None, iguales
+        else:
+            yield recuperar_clave(i, N, E_i, p) + (iguales,)
+
+def recuperar_clave(indice, N, E, p):
+    ''' Con un factor p de N, calculamos q, phi(N) y la private key d = E^-1 mod phi(N) (None si no existe).'''
+    q = N // p
+    p, q = min(p, q), max(p, q)
+    try:
+        d = get_modular_inverse(E, (p - 1) * (q - 1))
+    except ValueError: # E no es coprimo con phi(N), la clave ni siquiera era válida
+        d = None
+    return indice, N, E, p, q, d
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca claves RSA que comparten primos con el MCD por lotes.")
+    parser.add_argument('claves', help='archivo con una clave por línea: "N" o "N E"')
+    parser.add_argument('--directorio', help='dónde guardar los niveles de los árboles (por defecto, el temporal)')
+    argumentos = parser.parse_args()
+
+    for indice, N, E, p, q, d, iguales in claves_debiles(argumentos.claves, argumentos.directorio):
+        if p is None:
+            print(f"clave {indice}: N = {N} repetida en las claves {iguales}, no se puede factorizar con el MCD")
+        else:
+            repetida = f" (repetida en las claves {iguales})" if iguales else ""
+            print(f"clave {indice}: N = {N}, p = {p}, q = {q}, d = {d}{repetida}")
@@ -0,0 +1,149 @@
+# Benchmark de factorización para rsa.py: genera un corpus reproducible de semiprimos (con semilla fija) sobre una
+# grilla de cantidades de bits y de proporciones entre p y q, mide cada motor de factorización y guarda los resultados
+# en JSON. En modo regresión compara contra un JSON anterior y falla si algún caso se puso más lento que el umbral.
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from rsa import elegir_motor, es_primo_probable, factorizar_ecm, factorizar_semiprimo, pollard_brent, siqs
+
+BITS_POR_DEFECTO = [40, 60, 80, 100]
+# Fracción de los bits de N que le corresponde a p: 0.5 es una clave balanceada, valores menores son claves con
+# un factor chico (el caso en que ECM le gana a los demás).
+PROPORCIONES_POR_DEFECTO = [0.5, 0.4, 0.3]
+
+def motor_por_defecto(n, trabajo):
+    ''' El motor que factorizar_semiprimo elige con elegir_motor, pero siempre en un solo proceso.'''
+    if elegir_motor(n) is siqs:
+        return siqs(n, procesos=1, trabajo=trabajo)
+    return pollard_brent(n, trabajo=trabajo)
+
+# Motores a comparar: nombre -> (función que recibe N y un diccionario donde el motor suma su trabajo, y retorna
+# (p, q), máximo de bits en que vale la pena probarlo). Todos corren en un solo proceso, para que los tiempos sean
+# comparables y porque tracemalloc no ve la memoria de los procesos hijos.
+MOTORES = {
+    'factorizar_semiprimo': (lambda N, trabajo: factorizar_semiprimo(N, lambda n: motor_por_defecto(n, trabajo)),
+                             128),
+    'pollard_brent': (lambda N, trabajo: factorizar_semiprimo(
+        N, lambda n: pollard_brent(n, trabajo=trabajo), etapas=[]), 90),
+    'siqs': (lambda N, trabajo: factorizar_semiprimo(
+        N, lambda n: siqs(n, procesos=1, trabajo=trabajo), etapas=[]), 200),
+    'ecm': (lambda N, trabajo: factorizar_semiprimo(
+        N, lambda n: factorizar_ecm(n, B1=2000, procesos=1, trabajo=trabajo), etapas=[]), 200),
+}
+
+def primo_aleatorio(bits, aleatorio):
+    ''' Primo aleatorio de exactamente "bits" bits (el bit más alto siempre está encendido).'''
+    while True:
+        candidato = aleatorio.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if es_primo_probable(candidato):
+            return candidato
+
+def generar_corpus(bits=BITS_POR_DEFECTO, proporciones=PROPORCIONES_POR_DEFECTO, por_celda=3, semilla=2310):
+    '''
+    Genera por_celda semiprimos N = p * q para cada combinación de cantidad de bits y proporción, de forma
+    reproducible a partir de la semilla. Retorna una lista de diccionarios con bits, proporcion, indice, N, p y q.
+    '''
+    aleatorio = random.Random(semilla)
+    corpus = []
+    for total in bits:
+        for proporcion in proporciones:
+            bits_p = max(2, round(total * proporcion))
+            for indice in range(por_celda):
+                p = primo_aleatorio(bits_p, aleatorio)
+                q = primo_aleatorio(total - bits_p, aleatorio)
+                corpus.append({'bits': total, 'proporcion': proporcion, 'indice': indice,
+                               'N': p * q, 'p': min(p, q), 'q': max(p, q)})
+    return corpus
+
+def medir(motor, caso, repeticiones):
+    '''
+    Mide un motor sobre un caso: repeticiones corridas cronometradas (sin tracemalloc, que las haría más lentas)
+    y una corrida extra con tracemalloc para obtener el pico de memoria. También verifica que el resultado sea correcto.
+    En 'trabajo' queda, por cada repetición, lo que reportó el motor (pasos de rho, curvas de ECM, polinomios y
+    relaciones de SIQS; vacío si el caso se resolvió en las etapas rápidas), para distinguir una regresión en el
+    costo por paso de una corrida que simplemente necesitó más pasos.
+    '''
+    tiempos, trabajos = [], []
+    for _ in range(repeticiones):
+        trabajo = {}
+        inicio = time.perf_counter()
+        resultado = motor(caso['N'], trabajo)
+        tiempos.append(time.perf_counter() - inicio)
+        trabajos.append(trabajo)
+        if tuple(resultado) != (caso['p'], caso['q']):
+            raise AssertionError(f"factorización incorrecta de {caso['N']}: {resultado}")
+
+    tracemalloc.start()
+    motor(caso['N'], None)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'repeticiones': repeticiones, 'segundos_min': min(tiempos),
+            'segundos_mediana': statistics.median(tiempos), 'memoria_pico_bytes': pico, 'trabajo': trabajos}
+
+def correr_benchmark(corpus, motores, repeticiones=3):
+    ''' Corre cada motor sobre todos los casos del corpus que no superen su máximo de bits.'''
+    resultados = []
+    for nombre in motores:
+        motor, max_bits = MOTORES[nombre]
+        for caso in corpus:
+            if caso['bits'] > max_bits:
+                continue
+            fila = {'motor': nombre, 'bits': caso['bits'], 'proporcion': caso['proporcion'],
+                    'indice': caso['indice'], 'N': str(caso['N'])}
+            fila.update(medir(motor, caso, repeticiones))
+            print(f"{nombre:<22}{caso['bits']:>5} bits  p/N={caso['proporcion']:<5}"
+                  f"{fila['segundos_mediana']:>10.4f} s{fila['memoria_pico_bytes'] / 1024:>10.1f} KiB")
+            resultados.append(fila)
+    return resultados
+
+def comparar(resultados, anteriores, umbral, tolerancia=0.005):
+    '''
+    Compara la mediana de cada caso contra la del JSON anterior (mismo motor, bits, proporción e índice) y retorna
+    la lista de regresiones: casos que ahora son más lentos que (1 + umbral) veces el tiempo anterior. Las diferencias
+    menores a tolerancia segundos se ignoran, porque en los casos de milisegundos son puro ruido.
+    '''
+    clave = lambda fila: (fila['motor'], fila['bits'], fila['proporcion'], fila['indice'])
+    previos = {clave(fila): fila for fila in anteriores}
+    regresiones = []
+    for fila in resultados:
+        previa = previos.get(clave(fila))
+        if previa is None or fila['segundos_mediana'] - previa['segundos_mediana'] < tolerancia:
+            continue
+        if fila['segundos_mediana'] > (1 + umbral) * previa['segundos_mediana']:
+            regresiones.append((fila, previa))
+    return regresiones
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los motores de factorización de rsa.py.")
+    parser.add_argument('--bits', type=int, nargs='+', default=BITS_POR_DEFECTO)
+    parser.add_argument('--proporciones', type=float, nargs='+', default=PROPORCIONES_POR_DEFECTO)
+    parser.add_argument('--por-celda', type=int, default=3, help='semiprimos por combinación de bits y proporción')
+    parser.add_argument('--semilla', type=int, default=2310)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--motores', nargs='+', choices=list(MOTORES), default=list(MOTORES))
+    parser.add_argument('--salida', default='benchmark_rsa.json', help='archivo JSON con los resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior, activa el modo regresión')
+    parser.add_argument('--umbral', type=float, default=0.2, help='fracción de lentitud tolerada en modo regresión')
+    parser.add_argument('--tolerancia', type=float, default=0.005, help='segundos de diferencia que se ignoran')
+    argumentos = parser.parse_args()
+
+    corpus = generar_corpus(argumentos.bits, argumentos.proporciones, argumentos.por_celda, argumentos.semilla)
+    resultados = correr_benchmark(corpus, argumentos.motores, argumentos.repeticiones)
+    with open(argumentos.salida, 'w') as archivo:
+        json.dump({'semilla': argumentos.semilla, 'repeticiones': argumentos.repeticiones,
+                   'resultados': resultados}, archivo, indent=2)
+
+    if argumentos.comparar:
+        with open(argumentos.comparar) as archivo:
+            regresiones = comparar(resultados, json.load(archivo)['resultados'], argumentos.umbral,
+                                   argumentos.tolerancia)
+        for fila, previa in regresiones:
+            print(f"REGRESIÓN {fila['motor']} {fila['bits']} bits p/N={fila['proporcion']} #{fila['indice']}: "
+                  f"{previa['segundos_mediana']:.4f} s -> {fila['segundos_mediana']:.4f} s")
+        if regresiones:
+            sys.exit(1)
@@ -0,0 +1,168 @@
+# Construcción de códigos de borrado grandes como SparseCode (ver erasure.py): ensambles LDPC regulares e irregulares
+# y códigos LT (fuente) con la distribución solitón robusta. Todas las funciones reciben una semilla, así que el mismo
+# llamado siempre genera el mismo código, y el muestreo se hace con NumPy sin rechazo, por lo que el costo no se dispara
+# cuando los sets se acercan al largo del mensaje.
+# Igual que en GenTests, el parity set i contiene su propio bit de paridad (posición messageBits + i) más las
+# posiciones del mensaje que suma.
+import math
+
+import numpy as np
+
+from erasure import SparseCode
+
+
+def build_code(messageBits, rows):
+    '''
+    Arma un SparseCode a partir de una lista de arreglos, uno por parity set, con las posiciones del mensaje de cada uno;
+    a cada set se le agrega su bit de paridad al principio.
+    '''
+    parityBits = len(rows)
+    lengths = np.fromiter((len(row) + 1 for row in rows), dtype=np.int64, count=parityBits)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    indices[indptr[:-1]] = messageBits + np.arange(parityBits)
+    mask = np.ones(len(indices), dtype=bool)
+    mask[indptr[:-1]] = False
+    indices[mask] = np.concatenate(rows) if parityBits else []
+    return SparseCode(messageBits, parityBits, indptr, indices)
+
+
+def sample_distinct(rng, population, degrees):
+    '''
+    Para cada grado d de degrees, elige d posiciones distintas de range(population), uniformemente y sin rechazo.
+    Los sets del mismo grado (chico) se muestrean juntos: el j-ésimo elemento es un número x en [0, population - j)
+    que se corre una posición por cada elemento ya elegido que sea menor o igual, así que cae en el x-ésimo lugar libre.
+    Los grados grandes (poco frecuentes) se muestrean de a uno con rng.choice sin reemplazo.
+    '''
+    rows = [None] * len(degrees)
+    degrees = np.asarray(degrees)
+    for degree in np.unique(degrees):
+        members = np.nonzero(degrees == degree)[0]
+        if degree > 32:
+            for member in members:
+                rows[member] = rng.choice(population, degree, replace=False)
+            continue
+        chosen = np.empty((len(members), 0), dtype=np.int64) # Elegidos hasta ahora, ordenados en cada fila
+        for j in range(degree):
+            value = rng.integers(0, population - j, size=len(members))
+            for column in range(j): # chosen está ordenado, así que basta una pasada de izquierda a derecha
+                value += chosen[:, column] <= value
+            chosen = np.sort(np.concatenate((chosen, value[:, None]), axis=1), axis=1)
+        # Desordenamos cada fila para no sesgar el orden de las posiciones dentro del set
+        chosen = np.take_along_axis(chosen, rng.permuted(np.tile(np.arange(degree), (len(members), 1)), axis=1), axis=1)
+        for member, row in zip(members, chosen):
+            rows[member] = row
+    return rows
+
+
+def socket_code(messageBits, rowDegrees, messageDegrees, rng):
+    '''
+    Modelo de configuración: cada bit del mensaje aporta tantos "enchufes" como su grado, se permutan al azar y se
+    reparten en orden entre los parity sets según su grado. Si un set recibe dos veces el mismo bit, intercambiamos
+    el repetido con un enchufe de otro set elegido al azar donde no genere otra repetición.
+    '''
+    sockets = rng.permutation(np.repeat(np.arange(messageBits), messageDegrees))
+    bounds = np.concatenate(([0], np.cumsum(rowDegrees)))
+    rows = [sockets[bounds[i]:bounds[i + 1]] for i in range(len(rowDegrees))]
+
+    # Filas con repetidos: ordenamos los enchufes por (fila, bit) y buscamos vecinos iguales dentro de la misma fila
+    rowIds = np.repeat(np.arange(len(rowDegrees)), rowDegrees)
+    order = np.lexsort((sockets, rowIds))
+    repeated = (sockets[order][1:] == sockets[order][:-1]) & (rowIds[order][1:] == rowIds[order][:-1])
+    contents = {}
+    for i in np.unique(rowIds[order][1:][repeated]).tolist():
+        row = rows[i]
+        seen = set()
+        for position in range(len(row)):
+            value = int(row[position])
+            if value not in seen:
+                seen.add(value)
+                continue
+            while True: # Buscamos otro set que pueda recibir este bit y entregarnos uno que no tengamos
+                other = int(rng.integers(len(rows)))
+                if other == i or len(rows[other]) == 0:
+                    continue
+                if other not in contents:
+                    contents[other] = set(rows[other].tolist())
+                otherPosition = int(rng.integers(len(rows[other])))
+                otherValue = int(rows[other][otherPosition])
+                if otherValue in seen or value in contents[other]:
+                    continue
+                rows[other][otherPosition] = value
+                contents[other].discard(otherValue)
+                contents[other].add(value)
+                row[position] = otherValue
+                seen.add(otherValue)
+                break
+        contents[i] = seen
+    return rows
+
+
+def balanced(total, parts):
+    ''' Reparte total en parts enteros que difieren a lo más en 1.'''
+    sizes = np.full(parts, total // parts, dtype=np.int64)
+    sizes[:total % parts] += 1
+    return sizes
+
+
+def regular_ldpc(messageBits, parityBits, rowWeight, seed=None):
+    '''
+    Ensamble LDPC regular: cada parity set tiene rowWeight posiciones (su bit de paridad y rowWeight - 1 del mensaje)
+    y cada bit del mensaje aparece en la misma cantidad de sets (salvo una diferencia de 1 si no es divisible).
+    '''
+    if rowWeight - 1 > messageBits:
+        raise ValueError("Un parity set no puede tener más posiciones del mensaje que el mensaje")
+    rng = np.random.default_rng(seed)
+    rowDegrees = np.full(parityBits, rowWeight - 1, dtype=np.int64)
+    messageDegrees = rng.permutation(balanced(int(rowDegrees.sum()), messageBits))
+    return build_code(messageBits, socket_code(messageBits, rowDegrees, messageDegrees, rng))
+
+
+def irregular_ldpc(messageBits, parityBits, degreeDistribution, seed=None):
+    '''
+    Ensamble LDPC irregular: degreeDistribution indica, para cada grado, la fracción de bits del mensaje que tienen ese
+    grado (por ejemplo {2: 0.5, 3: 0.3, 8: 0.2}). La cantidad de bits de cada grado se redondea para que sumen
+    messageBits, y las aristas se reparten lo más parejo posible entre los parity sets.
+    '''
+    rng = np.random.default_rng(seed)
+    degrees = sorted(degreeDistribution)
+    weights = np.array([degreeDistribution[d] for d in degrees], dtype=float)
+    counts = np.floor(weights / weights.sum() * messageBits).astype(np.int64)
+    counts[np.argmax(weights)] += messageBits - counts.sum() # Lo que sobra del redondeo va al grado más frecuente
+    messageDegrees = rng.permutation(np.repeat(degrees, counts))
+    rowDegrees = balanced(int(messageDegrees.sum()), parityBits)
+    if rowDegrees.max(initial=0) > messageBits:
+        raise ValueError("Hay muy pocos parity sets para tantas aristas")
+    return build_code(messageBits, socket_code(messageBits, rowDegrees, messageDegrees, rng))
+
+
+def robust_soliton(k, c=0.1, delta=0.5):
+    '''
+    Distribución solitón robusta de Luby sobre los grados 1..k: el solitón ideal rho(1) = 1/k, rho(d) = 1/(d(d-1)),
+    más tau, que agrega grados bajos y un pico en k/R para que el decodificador no se quede sin sets de grado 1,
+    con R = c * ln(k/delta) * sqrt(k). Retorna el arreglo de probabilidades de los grados 1..k.
+    '''
+    d = np.arange(1, k + 1, dtype=float)
+    rho = np.empty(k)
+    rho[0] = 1 / k
+    rho[1:] = 1 / (d[1:] * (d[1:] - 1))
+
+    R = c * math.log(k / delta) * math.sqrt(k)
+    spike = min(k, max(1, int(round(k / R))))
+    tau = np.zeros(k)
+    tau[:spike - 1] = R / (d[:spike - 1] * k)
+    tau[spike - 1] = R * math.log(R / delta) / k
+    mu = rho + np.maximum(tau, 0)
+    return mu / mu.sum()
+
+
+def lt_code(messageBits, symbols, c=0.1, delta=0.5, seed=None):
+    '''
+    Código LT (fuente): cada uno de los symbols símbolos codificados es el XOR de d bits distintos del mensaje, con d
+    tomado de la distribución solitón robusta. Como SparseCode, el símbolo i es el "bit de paridad" messageBits + i,
+    así que el receptor marca todo el mensaje como borrado, recibe los símbolos que lleguen y decodifica por peeling,
+    que es justamente el decodificador de LT. Como no hay una cantidad fija de símbolos, sirve para transporte sin tasa.
+    '''
+    rng = np.random.default_rng(seed)
+    degrees = rng.choice(np.arange(1, messageBits + 1), size=symbols, p=robust_soliton(messageBits, c, delta))
+    return build_code(messageBits, sample_distinct(rng, messageBits, degrees))
@@ -1,49 +1,480 @@
+import collections
+import itertools
+import mmap
+import os
 import random
+import time
+
+import numpy as np
+
+def pack_batch(bits):
+    ''' Empaqueta un lote de bits (B, n) en (n, palabras de 64 bits), rellenando el lote con ceros hasta un múltiplo de 64.'''
+    packed = np.packbits(np.asarray(bits, dtype=bool).T, axis=1)
+    padding = (-packed.shape[1]) % 8
+    return np.ascontiguousarray(np.pad(packed, ((0, 0), (0, padding)))).view(np.uint64)
+
+
+def unpack_batch(packed, batchSize):
+    ''' Operación inversa de pack_batch: (n, palabras de 64 bits) -> (B, n) uint8.'''
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=batchSize).T
+
+
+def split_rows(indptr, indices):
+    ''' Separa un arreglo CSR en una lista de listas de Python (convertir todo de una vez es mucho más rápido que por fila).'''
+    flat, bounds = indices.tolist(), indptr.tolist()
+    return [flat[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+class SparseCode:
+    '''
+    Representación compacta de los parity sets como una matriz de paridad dispersa en formato CSR: las posiciones del
+    parity set i son indices[indptr[i]:indptr[i+1]]. Son dos arreglos de enteros en vez de una lista de sets de Python,
+    y la comparten CodeSpec (para decodificar) y el codificador sistemático encode.
+    '''
+    def __init__(self, messageBits, parityBits, indptr, indices):
+        self.messageBits = messageBits
+        self.parityBits = parityBits
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    @classmethod
+    def fromSets(cls, messageBits, parityBits, paritySets):
+        lengths = np.fromiter(map(len, paritySets), dtype=np.int64, count=len(paritySets))
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.fromiter(itertools.chain.from_iterable(paritySets), dtype=np.int64, count=int(indptr[-1]))
+        return cls(messageBits, parityBits, indptr, indices)
+
+    def toLists(self):
+        ''' Los parity sets como listas de Python (para el decodificador por peeling, que itera posición a posición).'''
+        return split_rows(self.indptr, self.indices)
+
+    def positionIndex(self):
+        '''
+        La matriz transpuesta, también en CSR: los parity sets que contienen la posición j son
+        setIds[posptr[j]:posptr[j+1]]. Se obtiene ordenando las aristas por posición, sin recorrerlas en Python.
+        '''
+        length = self.messageBits + self.parityBits
+        rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind='stable')
+        posptr = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=length))))
+        return posptr, rows[order]
+
+    def groupedBySize(self):
+        ''' Parity sets agrupados por tamaño, cada grupo como un arreglo (cantidad de sets, tamaño) de posiciones.'''
+        lengths = np.diff(self.indptr)
+        groups = []
+        for size in np.unique(lengths):
+            starts = self.indptr[:-1][lengths == size]
+            groups.append(self.indices[starts[:, None] + np.arange(size)].astype(np.intp))
+        return groups
+
+    def encode(self, messages):
+        '''
+        Codificador sistemático vectorizado: la palabra es el mensaje seguido de un bit de paridad por cada set, que es
+        el XOR de los bits del mensaje en ese set. Acepta un mensaje (k,) o un lote (B, k); empaquetamos el lote en bits
+        como en correctErasuresBatch y cada paridad sale de un XOR acumulado (reduceat) sobre las filas del mensaje.
+        '''
+        messages = np.asarray(messages, dtype=np.uint8)
+        single = messages.ndim == 1
+        if single:
+            messages = messages[None, :]
+        if messages.shape[1] != self.messageBits:
+            raise ValueError("Length must match")
+        packed = pack_batch(messages & 1)
+
+        isMessage = self.indices < self.messageBits # Igual que antes, sólo suman las posiciones del mensaje
+        rows = np.repeat(np.arange(self.parityBits), np.diff(self.indptr))
+        counts = np.bincount(rows[isMessage], minlength=self.parityBits) # Posiciones del mensaje en cada set
+        starts = np.cumsum(counts) - counts
+        # Agregamos una fila de ceros al final para que reduceat acepte sets vacíos al final
+        gathered = np.concatenate((packed[self.indices[isMessage]], np.zeros((1, packed.shape[1]), dtype=np.uint64)))
+        parity = np.bitwise_xor.reduceat(gathered, starts, axis=0) if self.parityBits else gathered[:0]
+        parity[counts == 0] = 0 # reduceat con un tramo vacío devuelve un elemento, no cero
+
+        codewords = np.concatenate((messages & 1, unpack_batch(parity, len(messages))), axis=1)
+        return codewords[0] if single else codewords
+
 
 class CodeSpec:
-    def __init__(self,messageBits,parityBits,paritySets):
+    def __init__(self,messageBits,parityBits,paritySets,planCacheSize=1024):
         self.messageBits = messageBits # length of the original message
         self.parityBits = parityBits # number of parity sets/bits
+        # Los parity sets se pueden entregar como lista de sets o directamente como un SparseCode
+        if isinstance(paritySets, SparseCode):
+            self.sparse = paritySets
+            paritySets = paritySets.toLists()
+        else:
+            self.sparse = SparseCode.fromSets(messageBits, parityBits, paritySets)
         self.paritySets = paritySets # an array of parity sets
-
-    def correctErasures(self, code):
+        # Índice de incidencia: para cada posición del código, la lista de parity sets (por su índice) que la contienen.
+        # Se calcula una sola vez por código, así el decodificador no vuelve a recorrer todos los sets en cada pasada.
+        posptr, setIds = self.sparse.positionIndex()
+        self.setsByPosition = split_rows(posptr, setIds)
+        self.setIndexArrays = None # Parity sets agrupados por tamaño como arreglos de NumPy, se arman en el primer lote
+        # Caché LRU acotado de planes de decodificación, indexado por el patrón de borrado (tupla de posiciones).
+        # Es un OrderedDict propio de la instancia (y no functools.lru_cache sobre el método), así el CodeSpec se puede
+        # serializar con pickle y no queda un ciclo de referencias entre el objeto y su caché.
+        self.planCacheSize = planCacheSize
+        self.planCache = collections.OrderedDict()
+        self.planHits = 0
+        self.planMisses = 0
+
+    def correctErasures(self, code, elimination=False, stats=None):
+        '''
+        Decodificador por "peeling": un parity set con exactamente una incógnita la determina, porque la suma de sus bits
+        debe ser par. En vez de recorrer todos los sets en cada pasada, llevamos por cada set la cantidad de incógnitas,
+        el XOR de sus bits conocidos y el XOR de las posiciones de sus incógnitas (que, cuando queda una sola, es justo
+        su posición), y una cola con los sets que bajaron a una incógnita. Al resolver una posición sólo actualizamos
+        los sets que la contienen, así que cada arista (set, posición) se toca una cantidad constante de veces.
+        Con elimination=True, si el peeling se estanca con incógnitas pendientes, resolvemos las ecuaciones que quedan
+        con eliminación gaussiana sobre GF(2) (ver solveRemaining), lo que recupera todas las posiciones que el sistema
+        lineal determina (decodificación de máxima verosimilitud).
+        Si se entrega un DecodeStats en stats, se registran en él las pasadas, visitas y el stopping set (ver peel).
+        '''
         # Almacenamos una copia del código en memoria por valor, no por referencia, así los test no se ven afectados:
         list_of_code = list(code)
 
-        # Hacemos un bucle while hasta que en una iteración no se pueda reconstruir nada del código original.
-        code_has_been_changed = True # Debe ser True para iniciar el bucle, si no hay cambios se sale del bucle
-
-        while code_has_been_changed:
-            code_has_been_changed = False  # Marcador para saber si en esta vuelta reconstruimos algo
-
-            for paritySet in self.paritySets:
-                # En el parity set buscamos posiciones de bits desconocidas con signo ?
-                unknown_positions = []
-                
-                for idx in paritySet:
-                    if list_of_code[idx] == '?':
-                        unknown_positions.append(idx) # Si encontramos una posición de un bit desconocido, la almacenamos
-                        # print(f"- Unknown position in MESSAGEEEEE {list_of_code} found in the index {idx} -")
-
-                unknow_bits_quantity = len(unknown_positions)
-                        
-
-                if unknow_bits_quantity == 1: # Únicamente podemos reconstruir el código si hay exactamente una incógnita en este parity set
-                    current_missing_idx = unknown_positions[0]
-
-                    parity_sum = 0
-                    # Ahora, hacemos un bucle y vamos sumando la paridad de cada bit conocido en el parity set,
-                    # para obtener la paridad total del set (la suma debe ser par, es decir, 0 módulo 2).
-                    for idx in paritySet:
-                        if list_of_code[idx] != '?':  # Sólo sumamos los bits ya reconstruidos o recibidos
-                            parity_sum = (parity_sum + int(list_of_code[idx])) % 2 # Sumamos módulo 2, para obtener paridad par.
-
-                    list_of_code[current_missing_idx] = parity_sum # Cambiamos el valor de paridad al bit que falta
-                    code_has_been_changed = True  # Indicamos que en esta iteración hubo un cambio, para volver a iterar!
-                    
+        unknown_count, known_parity = self.peel(list_of_code, stats)
+        if elimination and any(unknown_count):
+            self.solveRemaining(list_of_code, unknown_count, known_parity)
+
         # Esto retornará una list comprehension que convierte los bits '0' y '1' a números enteros, y deja los signos ? en string:
         return [int(n) if n in ('0', '1') else n for n in list_of_code] # Si no se pudo reconstruir todo, quedarán signos ? en el código
 
+    def peel(self, list_of_code, stats=None):
+        '''
+        Hace el peeling sobre list_of_code (modificándola) y retorna, para cada parity set, la cantidad de incógnitas
+        que le quedaron y el XOR de sus bits conocidos.
+        La cola se procesa por pasadas: una pasada son los sets que entraron a la cola durante la pasada anterior (el
+        equivalente a una vuelta del while original). Con stats (un DecodeStats) se registran las visitas y
+        resoluciones de cada pasada y, si el peeling se estanca, el stopping set que quedó; sin stats sólo se paga
+        un if por pasada.
+        '''
+        unknown_count = [0] * len(self.paritySets) # Cantidad de incógnitas de cada parity set
+        known_parity = [0] * len(self.paritySets) # XOR (suma módulo 2) de los bits conocidos de cada set
+        unknown_xor = [0] * len(self.paritySets) # XOR de las posiciones desconocidas de cada set
+        for setIndex, paritySet in enumerate(self.paritySets):
+            for idx in paritySet:
+                if list_of_code[idx] == '?':
+                    unknown_count[setIndex] += 1
+                    unknown_xor[setIndex] ^= idx
+                else:
+                    known_parity[setIndex] ^= int(list_of_code[idx])
+
+        # Cola de trabajo con los sets que tienen exactamente una incógnita
+        queue = [setIndex for setIndex, count in enumerate(unknown_count) if count == 1]
+
+        while queue:
+            next_queue = [] # Sets que bajan a una incógnita durante esta pasada
+            resolved = 0
+            for setIndex in queue:
+                if unknown_count[setIndex] != 1: # Otro set ya resolvió su incógnita mientras esperaba en la cola
+                    continue
+                current_missing_idx = unknown_xor[setIndex]
+                parity_sum = known_parity[setIndex]
+                list_of_code[current_missing_idx] = parity_sum # Cambiamos el valor de paridad al bit que falta
+                resolved += 1
+
+                # Actualizamos sólo los sets que contienen la posición que acabamos de reconstruir
+                for otherSet in self.setsByPosition[current_missing_idx]:
+                    unknown_count[otherSet] -= 1
+                    unknown_xor[otherSet] ^= current_missing_idx
+                    known_parity[otherSet] ^= parity_sum
+                    if unknown_count[otherSet] == 1:
+                        next_queue.append(otherSet)
+            if stats is not None:
+                stats.recordPass(len(queue), resolved)
+            queue = next_queue
+
+        if stats is not None:
+            stats.recordEnd(len(self.paritySets), [idx for idx, bit in enumerate(list_of_code) if bit == '?'],
+                            [setIndex for setIndex, count in enumerate(unknown_count) if count > 0])
+        return unknown_count, known_parity
+
+    def solveRemaining(self, list_of_code, unknown_count, known_parity):
+        '''
+        Eliminación gaussiana sobre GF(2) sólo con los parity sets que el peeling dejó con incógnitas (decodificación
+        por inactivación). Cada ecuación dice que el XOR de sus incógnitas es igual al XOR de sus bits conocidos, y la
+        guardamos empaquetada en un int de Python (el bit j representa la j-ésima incógnita), así que sumar dos filas es
+        un solo XOR. Mantenemos las filas en forma escalonada reducida: una incógnita queda determinada si y sólo si su
+        fila pivote no tiene ninguna otra incógnita, y en ese caso su valor es el lado derecho de la fila.
+        '''
+        column_of = {} # posición desconocida -> columna en la matriz
+        pivots = [] # filas reducidas como (columna pivote, máscara, lado derecho)
+        for setIndex, paritySet in enumerate(self.paritySets):
+            if unknown_count[setIndex] == 0:
+                continue
+            mask = 0
+            for idx in paritySet:
+                if list_of_code[idx] == '?':
+                    mask |= 1 << column_of.setdefault(idx, len(column_of))
+            rhs = known_parity[setIndex]
+
+            for column, pivot_mask, pivot_rhs in pivots: # Reducimos la fila nueva con los pivotes que ya existen
+                if (mask >> column) & 1:
+                    mask ^= pivot_mask
+                    rhs ^= pivot_rhs
+            if not mask:
+                continue # Ecuación redundante (o inconsistente, si rhs es 1: el canal no debería producirlas)
+            column = (mask & -mask).bit_length() - 1
+            for i, (other_column, pivot_mask, pivot_rhs) in enumerate(pivots): # Y sacamos la nueva columna de las demás
+                if (pivot_mask >> column) & 1:
+                    pivots[i] = (other_column, pivot_mask ^ mask, pivot_rhs ^ rhs)
+            pivots.append((column, mask, rhs))
+
+        position_of = {column: idx for idx, column in column_of.items()}
+        for column, mask, rhs in pivots:
+            if mask & (mask - 1) == 0: # La fila tiene un solo bit: la incógnita está determinada
+                list_of_code[position_of[column]] = rhs
+
+
+    def compilePlan(self, erasedPositions):
+        '''
+        Compila el orden de resolución del peeling para un patrón de borrado dado (sin mirar los bits): una lista de
+        pasos (posición objetivo, posiciones fuente) en que el bit objetivo es el XOR de las fuentes, que son las demás
+        posiciones de su parity set (recibidas o resueltas en un paso anterior). Las posiciones que el peeling no puede
+        resolver simplemente no aparecen en el plan.
+        '''
+        erased = set(erasedPositions)
+        unknown_count = [0] * len(self.paritySets)
+        unknown_xor = [0] * len(self.paritySets)
+        for setIndex, paritySet in enumerate(self.paritySets):
+            for idx in paritySet:
+                if idx in erased:
+                    unknown_count[setIndex] += 1
+                    unknown_xor[setIndex] ^= idx
+
+        plan = []
+        queue = collections.deque(setIndex for setIndex, count in enumerate(unknown_count) if count == 1)
+        while queue:
+            setIndex = queue.popleft()
+            if unknown_count[setIndex] != 1:
+                continue
+            target = unknown_xor[setIndex]
+            plan.append((target, tuple(idx for idx in self.paritySets[setIndex] if idx != target)))
+            for otherSet in self.setsByPosition[target]:
+                unknown_count[otherSet] -= 1
+                unknown_xor[otherSet] ^= target
+                if unknown_count[otherSet] == 1:
+                    queue.append(otherSet)
+        return tuple(plan)
+
+    def planFor(self, erased):
+        ''' Plan compilado para el patrón de borrado erased, buscándolo primero en el caché LRU.'''
+        plan = self.planCache.get(erased)
+        if plan is not None:
+            self.planHits += 1
+            self.planCache.move_to_end(erased)
+            return plan
+        self.planMisses += 1
+        plan = self.compilePlan(erased)
+        self.planCache[erased] = plan
+        if self.planCacheSize is not None and len(self.planCache) > self.planCacheSize: # None: sin límite
+            self.planCache.popitem(last=False) # Descartamos el usado hace más tiempo
+        return plan
+
+    def correctErasuresCached(self, code):
+        '''
+        Igual que correctErasures (sin eliminación), pero usando el plan compilado para el patrón de borrado de code,
+        que se busca en el caché LRU: si el patrón ya apareció, decodificar es una sola pasada de XORs en línea recta.
+        '''
+        list_of_code = list(code)
+        plan = self.planFor(tuple(idx for idx, bit in enumerate(list_of_code) if bit == '?'))
+        for target, sources in plan:
+            parity_sum = 0
+            for idx in sources:
+                parity_sum ^= int(list_of_code[idx])
+            list_of_code[target] = parity_sum
+        return [int(n) if n in ('0', '1') else n for n in list_of_code]
+
+    def planCacheStats(self):
+        ''' Estadísticas del caché de planes: aciertos, fallos, planes guardados y capacidad máxima.'''
+        return {'hits': self.planHits, 'misses': self.planMisses, 'size': len(self.planCache),
+                'maxsize': self.planCacheSize}
+
+    def groupedSets(self):
+        ''' Parity sets agrupados por tamaño, cada grupo como un arreglo (cantidad de sets, tamaño) de posiciones.'''
+        if self.setIndexArrays is None:
+            self.setIndexArrays = self.sparse.groupedBySize()
+        return self.setIndexArrays
+
+    def correctErasuresBatch(self, codewords, erasures):
+        '''
+        Decodifica por peeling un lote de palabras a la vez. codewords es un arreglo (B, n) de bits 0/1 y erasures una
+        máscara booleana (B, n) con True en las posiciones borradas. Empaquetamos el lote en bits (64 palabras por cada
+        uint64), con una fila por posición del código, así cada operación lógica avanza 64 palabras a la vez.
+        En cada pasada, para cada parity set calculamos con ANDs y ORs en qué palabras tiene exactamente una incógnita
+        y cuál es, y le asignamos el XOR de los bits conocidos del set (las incógnitas valen 0, así que no suman).
+        Retorna (bits decodificados (B, n) uint8, máscara de posiciones que siguen borradas (B, n) bool).
+        '''
+        codewords = np.asarray(codewords, dtype=np.uint8)
+        erasures = np.asarray(erasures, dtype=bool)
+        batchSize = codewords.shape[0]
+
+        known = pack_batch(~erasures)
+        values = pack_batch((codewords & 1).astype(bool) & ~erasures)
+
+        progress = True
+        while progress:
+            progress = False
+            for indexArray in self.groupedSets():
+                unknown = ~known[indexArray] # (sets, tamaño, palabras)
+                seen = np.zeros_like(unknown[:, 0])
+                twice = np.zeros_like(seen)
+                for j in range(indexArray.shape[1]):
+                    twice |= seen & unknown[:, j]
+                    seen |= unknown[:, j]
+                resolvable = unknown & (seen & ~twice)[:, None, :] # La única incógnita de cada set, si la hay
+                if not resolvable.any():
+                    continue
+                parity = np.bitwise_xor.reduce(values[indexArray], axis=1)
+                flatIndex = indexArray.ravel()
+                resolvable = resolvable.reshape(len(flatIndex), -1)
+                np.bitwise_or.at(values, flatIndex, resolvable & np.repeat(parity, indexArray.shape[1], axis=0))
+                np.bitwise_or.at(known, flatIndex, resolvable)
+                progress = True
+
+        return unpack_batch(values, batchSize), unpack_batch(known, batchSize) == 0
+
+
+class DecodeStats:
+    '''
+    Registro de una decodificación por peeling: cantidad de pasadas, visitas a parity sets (la lectura inicial de
+    todos los sets más cada set sacado de la cola), resoluciones en cada pasada y, si el peeling se estanca, el
+    stopping set (posiciones que siguen borradas) y los sets que quedaron con dos o más incógnitas.
+    '''
+    def __init__(self):
+        self.passes = 0
+        self.setVisits = 0
+        self.resolutionsPerPass = []
+        self.stoppingSet = []
+        self.stalledSets = []
+
+    def recordPass(self, visits, resolved):
+        self.passes += 1
+        self.setVisits += visits
+        self.resolutionsPerPass.append(resolved)
+
+    def recordEnd(self, initialVisits, stoppingSet, stalledSets):
+        self.setVisits += initialVisits
+        self.stoppingSet = stoppingSet
+        self.stalledSets = stalledSets
+
+
+class DecodeHistograms:
+    '''
+    Histogramas de varias decodificaciones (por ejemplo, un lote de bloques): para cada métrica, valor -> cantidad de
+    bloques. export() retorna un diccionario serializable a JSON, para cruzar los bloques lentos o fallidos con la
+    estructura del código que los produjo.
+    '''
+    def __init__(self):
+        self.passes = collections.Counter()
+        self.setVisits = collections.Counter()
+        self.resolutionsPerPass = collections.Counter()
+        self.stoppingSetSize = collections.Counter()
+        self.stalledPositions = collections.Counter() # Cuántas veces cada posición quedó en un stopping set
+
+    def add(self, stats):
+        self.passes[stats.passes] += 1
+        self.setVisits[stats.setVisits] += 1
+        self.resolutionsPerPass.update(stats.resolutionsPerPass)
+        self.stoppingSetSize[len(stats.stoppingSet)] += 1
+        self.stalledPositions.update(stats.stoppingSet)
+
+    def export(self):
+        return {name: dict(sorted(counter.items())) for name, counter in (
+            ('passes', self.passes), ('setVisits', self.setVisits), ('resolutionsPerPass', self.resolutionsPerPass),
+            ('stoppingSetSize', self.stoppingSetSize), ('stalledPositions', self.stalledPositions))}
+
+
+def instrumented_decode(codeSpec, codes, elimination=False):
+    ''' Decodifica una lista de palabras con correctErasures registrando cada una; retorna (resultados, histogramas).'''
+    histograms = DecodeHistograms()
+    results = []
+    for code in codes:
+        stats = DecodeStats()
+        results.append(codeSpec.correctErasures(code, elimination, stats))
+        histograms.add(stats)
+    return results, histograms
+
+
+def measure_batch_throughput(codeSpec, codewords, erasures, repeats=3):
+    ''' Decodifica el lote repeats veces con correctErasuresBatch y retorna el mejor rendimiento en palabras por segundo.'''
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        codeSpec.correctErasuresBatch(codewords, erasures)
+        best = min(best, time.perf_counter() - start)
+    return len(codewords) / best
+
+
+def iter_buffer_chunks(source, chunkBytes):
+    '''
+    Generador de trozos (memoryview) de a lo más chunkBytes bytes de una fuente, sin copiar toda la entrada a memoria.
+    La fuente puede ser una ruta (se abre con mmap si es un archivo regular), un objeto con buffer (bytes, bytearray,
+    mmap, memoryview) o un archivo/pipe abierto en modo binario, que se lee con readinto sobre un buffer reutilizado.
+    '''
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view: # Hay que liberar las vistas antes de cerrar el mmap
+                    for start in range(0, len(view), chunkBytes):
+                        with view[start:start + chunkBytes] as chunk:
+                            yield chunk
+        return
+    if hasattr(source, 'readinto'):
+        buffer = bytearray(chunkBytes)
+        view = memoryview(buffer)
+        while True:
+            filled = 0
+            while filled < chunkBytes: # En un pipe, readinto puede entregar menos bytes de los pedidos
+                read = source.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            if filled == 0:
+                return
+            yield view[:filled]
+            if filled < chunkBytes:
+                return
+    view = memoryview(source).cast('B')
+    for start in range(0, len(view), chunkBytes):
+        yield view[start:start + chunkBytes]
+
+
+def decode_stream(codeSpec, codeSource, erasureSource, output, remainingOutput=None, chunkWords=4096):
+    '''
+    Decodifica un flujo de palabras empaquetadas en bits: cada palabra ocupa ceil(n/8) bytes (bit más significativo
+    primero, como np.packbits), y erasureSource tiene el mismo formato con un 1 en cada posición borrada. Se procesa de
+    a chunkWords palabras con correctErasuresBatch, y los bits recuperados se escriben empaquetados igual en output
+    (y, si se entrega, la máscara de posiciones que siguieron borradas en remainingOutput), así que la memoria usada
+    sólo depende de chunkWords y no del tamaño de la entrada. Retorna (palabras decodificadas, bits que siguen borrados).
+    '''
+    length = codeSpec.messageBits + codeSpec.parityBits
+    rowBytes = (length + 7) // 8
+    chunkBytes = rowBytes * chunkWords
+    totalWords, totalRemaining = 0, 0
+
+    # zip_longest y no zip: si un flujo se acaba antes, el chunk que falta llega vacío y el chequeo de largo falla, en
+    # vez de descartar en silencio las palabras que sobran del otro
+    for codeChunk, erasureChunk in itertools.zip_longest(iter_buffer_chunks(codeSource, chunkBytes),
+                                                         iter_buffer_chunks(erasureSource, chunkBytes), fillvalue=b''):
+        if len(codeChunk) != len(erasureChunk) or len(codeChunk) % rowBytes:
+            raise ValueError("Las palabras y los mapas de borrado deben tener el mismo largo, en palabras completas")
+        codewords = np.unpackbits(np.frombuffer(codeChunk, dtype=np.uint8).reshape(-1, rowBytes), axis=1, count=length)
+        erasures = np.unpackbits(np.frombuffer(erasureChunk, dtype=np.uint8).reshape(-1, rowBytes), axis=1,
+                                 count=length).astype(bool)
+        decoded, remaining = codeSpec.correctErasuresBatch(codewords, erasures)
+
+        output.write(np.packbits(decoded, axis=1).tobytes())
+        if remainingOutput is not None:
+            remainingOutput.write(np.packbits(remaining, axis=1).tobytes())
+        totalWords += len(decoded)
+        totalRemaining += int(remaining.sum())
+    return totalWords, totalRemaining
+
 
 class GenTests:
     def __init__(self,messageBits,parityBits,parityLength,message):
@@ -60,31 +491,20 @@ class GenTests:
         for i in range(self.parityBits): # generate the i-th parity set
             paritySet = set()
             paritySet.add(self.messageBits + i)
-            j = 1
-            while j < self.parityLength: # each set has parityLength positions
-                message_pos = random.randint(0, self.messageBits - 1)
-                if (message_pos not in paritySet):
-                    j = j + 1
-                    paritySet.add(message_pos)
+            # each set has parityLength positions: sampling without replacement, so there is no rejection loop
+            # that slows down when parityLength gets close to messageBits (see code_construction.py for large codes)
+            paritySet.update(random.sample(range(self.messageBits), self.parityLength - 1))
 
             paritySets.append(paritySet)    
 
         return paritySets
 
     def generate_code(self,message):
-        code = [0]*(self.messageBits + self.parityBits)
-        for i in range(len(message)):
-            code[i] = message[i]
+        # Codificamos con la representación dispersa (ver SparseCode.encode), que es vectorizada, en vez de recorrer
+        # cada parity set en Python. Para codificar muchos mensajes a la vez, usar SparseCode.encode con un lote.
         assert (len(message) == self.messageBits), "Length must match"
-        i = 0
-        for paritySet in self.paritySets:
-            sum = 0
-            for index in paritySet:
-                if (index < self.messageBits):
-                    sum = sum + message[index]
-            code[self.messageBits+i] = sum % 2
-            i = i +1
-        return code
+        code = SparseCode.fromSets(self.messageBits, self.parityBits, self.paritySets).encode(message)
+        return code.tolist()
 
 
 def run_test(name, message_bits, parity_bits, parity_length, parity_sets, code, transmitted):
@@ -0,0 +1,167 @@
+# Simulador Monte Carlo de la tasa de fallo del decodificador de borrado en función de la probabilidad de borrado.
+# El código se genera una vez con GenTests y se decodifica con CodeSpec; los ensayos se reparten en lotes entre un pool
+# de procesos, cada lote con su propio flujo de números aleatorios (SeedSequence.spawn), y un agregador va juntando los
+# resultados a medida que llegan y deja de pedir lotes para un punto cuando su intervalo de confianza es lo bastante
+# angosto. Se puede comparar el peeling contra la eliminación completa (correctErasures con elimination=True).
+import argparse
+import math
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from erasure import CodeSpec, GenTests
+
+DECODERS = ('peeling', 'elimination')
+
+
+class StreamingEstimate:
+    '''
+    Agregador de un punto (probabilidad de borrado, decodificador): acumula ensayos y fallos y calcula el intervalo de
+    Wilson, que se comporta bien incluso cuando todavía no se ha visto ningún fallo.
+    '''
+    def __init__(self, probability, decoder):
+        self.probability = probability
+        self.decoder = decoder
+        self.trials = 0
+        self.failures = 0
+
+    def update(self, trials, failures):
+        self.trials += trials
+        self.failures += failures
+
+    def rate(self):
+        return self.failures / self.trials if self.trials else 0.0
+
+    def interval(self, z=1.96):
+        if not self.trials:
+            return 0.0, 1.0
+        n, rate = self.trials, self.rate()
+        center = (rate + z * z / (2 * n)) / (1 + z * z / n)
+        halfWidth = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, center - halfWidth), min(1.0, center + halfWidth)
+
+    def converged(self, absoluteTolerance, relativeTolerance, maxTrials):
+        low, high = self.interval()
+        return self.trials >= maxTrials or (high - low) / 2 <= max(absoluteTolerance, relativeTolerance * self.rate())
+
+
+# CodeSpec de cada proceso, se arma una sola vez por proceso a partir de los parity sets.
+_worker = {}
+
+def _init_worker(messageBits, parityBits, paritySets):
+    _worker['codeSpec'] = CodeSpec(messageBits, parityBits, paritySets)
+
+
+def run_batch(probability, decoder, trials, seedSequence):
+    '''
+    Corre trials ensayos: como el código es lineal, la tasa de fallo no depende del mensaje, así que transmitimos la
+    palabra de ceros y sólo sorteamos qué posiciones se borran. Un ensayo falla si algún bit del mensaje queda borrado.
+    Retorna (probability, decoder, trials, fallos).
+    '''
+    codeSpec = _worker['codeSpec']
+    length = codeSpec.messageBits + codeSpec.parityBits
+    rng = np.random.default_rng(seedSequence)
+    erasures = rng.random((trials, length)) < probability
+    codewords = np.zeros((trials, length), dtype=np.uint8)
+
+    if decoder == 'peeling':
+        _, remaining = codeSpec.correctErasuresBatch(codewords, erasures)
+        failures = int(remaining[:, :codeSpec.messageBits].any(axis=1).sum())
+    else:
+        failures = 0
+        for erased in erasures:
+            received = ['?' if bit else 0 for bit in erased.tolist()]
+            recovered = codeSpec.correctErasures(received, elimination=True)
+            failures += '?' in recovered[:codeSpec.messageBits]
+    return probability, decoder, trials, failures
+
+
+def simulate(messageBits, parityBits, parityLength, probabilities, decoders=DECODERS, batchSize=2000,
+             maxTrials=10**6, absoluteTolerance=1e-4, relativeTolerance=0.05, processes=None, seed=2310,
+             onConverged=None):
+    '''
+    Estima la tasa de fallo para cada par (probabilidad, decodificador). Mantiene dos lotes en vuelo por proceso,
+    repartidos entre los puntos que todavía no convergen, y llama a onConverged(estimate) apenas un punto converge,
+    así los resultados se pueden ir mostrando sin esperar a los demás. Retorna la lista de StreamingEstimate.
+    '''
+    random.seed(seed) # GenTests usa el módulo random, así el código también es reproducible
+    paritySets = GenTests(messageBits, parityBits, parityLength, [0] * messageBits).paritySets
+    estimates = {(p, decoder): StreamingEstimate(p, decoder) for p in probabilities for decoder in decoders}
+    pending = {key: 0 for key in estimates} # Ensayos ya pedidos y todavía no recibidos de cada punto
+    rootSeed = np.random.SeedSequence(seed)
+    processes = processes or os.cpu_count() or 1
+
+    def next_batch():
+        # El punto activo con menos ensayos (recibidos más pedidos), para que todos avancen parejo
+        active = [key for key, estimate in estimates.items()
+                  if not estimate.converged(absoluteTolerance, relativeTolerance, maxTrials)
+                  and estimate.trials + pending[key] < maxTrials]
+        if not active:
+            return None
+        key = min(active, key=lambda key: estimates[key].trials + pending[key])
+        trials = min(batchSize, maxTrials - estimates[key].trials - pending[key])
+        pending[key] += trials
+        return key + (trials, rootSeed.spawn(1)[0])
+
+    def receive(probability, decoder, trials, failures):
+        key = (probability, decoder)
+        pending[key] -= trials
+        estimate = estimates[key]
+        wasConverged = estimate.converged(absoluteTolerance, relativeTolerance, maxTrials)
+        estimate.update(trials, failures)
+        if not wasConverged and onConverged and estimate.converged(absoluteTolerance, relativeTolerance, maxTrials):
+            onConverged(estimate)
+
+    if processes == 1:
+        _init_worker(messageBits, parityBits, paritySets)
+        while (batch := next_batch()) is not None:
+            receive(*run_batch(*batch))
+        return list(estimates.values())
+
+    with multiprocessing.Pool(processes, _init_worker, (messageBits, parityBits, paritySets)) as pool:
+        inFlight = []
+        while True:
+            while len(inFlight) < 2 * processes and (batch := next_batch()) is not None:
+                inFlight.append(pool.apply_async(run_batch, batch))
+            if not inFlight:
+                break
+            receive(*inFlight.pop(0).get()) # Esperamos al más antiguo, y recogemos los que ya hayan terminado
+            stillRunning = []
+            for result in inFlight:
+                if result.ready():
+                    receive(*result.get())
+                else:
+                    stillRunning.append(result)
+            inFlight = stillRunning
+    return list(estimates.values())
+
+
+def print_estimate(estimate):
+    low, high = estimate.interval()
+    print(f"p = {estimate.probability:<8} {estimate.decoder:<12} fallo = {estimate.rate():.6f}  "
+          f"IC95% [{low:.6f}, {high:.6f}]  ensayos = {estimate.trials}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curvas de tasa de fallo vs probabilidad de borrado.")
+    parser.add_argument('--message-bits', type=int, default=1000)
+    parser.add_argument('--parity-bits', type=int, default=500)
+    parser.add_argument('--parity-length', type=int, default=4)
+    parser.add_argument('--probabilities', type=float, nargs='+', default=[0.05, 0.1, 0.15, 0.2, 0.25])
+    parser.add_argument('--decoders', nargs='+', choices=DECODERS, default=list(DECODERS))
+    parser.add_argument('--batch', type=int, default=2000)
+    parser.add_argument('--max-trials', type=int, default=10**6)
+    parser.add_argument('--absolute-tolerance', type=float, default=1e-4)
+    parser.add_argument('--relative-tolerance', type=float, default=0.05)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--seed', type=int, default=2310)
+    args = parser.parse_args()
+
+    estimates = simulate(args.message_bits, args.parity_bits, args.parity_length, args.probabilities, args.decoders,
+                         args.batch, args.max_trials, args.absolute_tolerance, args.relative_tolerance,
+                         args.processes, args.seed, onConverged=print_estimate)
+    print()
+    for estimate in sorted(estimates, key=lambda estimate: (estimate.probability, estimate.decoder)):
+        print_estimate(estimate)
@@ -0,0 +1,170 @@
+# Clasificación por lotes de tablas de Cayley, salvo isomorfismo, usando la clase Grupo de t2.py.
+# Comparar cada par de tablas probando las n! biyecciones es imposible, así que refinamos en etapas:
+# 1 - Invariantes baratos: n, si es abeliano, el tamaño del centro y cuántos elementos hay de cada orden.
+# 2 - Sólo para los baldes donde chocan dos o más tablas: cuántos subgrupos hay de cada orden.
+# 3 - Sólo si todavía chocan: una forma canónica exacta. Se re-etiquetan los elementos recorriendo el grupo en anchura
+#     desde e con una tupla generadora (g1, ..., gd) de largo mínimo, y nos quedamos con la tabla re-etiquetada más
+#     chica entre todas las tuplas generadoras. Un isomorfismo lleva tuplas generadoras en tuplas generadoras y
+#     conserva el recorrido, así que dos grupos son isomorfos si y sólo si tienen la misma forma canónica.
+#     El costo es proporcional a la cantidad de tuplas generadoras (del orden de |Aut(G)|), no a n!, pero eso sigue
+#     siendo mucho para grupos con muchos automorfismos: hay que esperar segundos o más para grupos no abelianos con
+#     |Aut(G)| sobre ~10^5 (por ejemplo productos de un grupo chico con (Z2)^k, k >= 3).
+# Los grupos abelianos no pasan por las etapas 2 y 3: un grupo abeliano finito queda determinado, salvo isomorfismo,
+# por cuántos elementos tiene de cada orden, así que su balde de la etapa 1 ya es una clase. Es justamente el caso
+# en que la forma canónica sería más cara, porque (Z2)^k tiene |GL(k, 2)| automorfismos.
+# Cada etapa se reparte entre un pool de procesos.
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from t2 import Grupo
+
+def grupo_silencioso(cayley):
+	return Grupo(len(cayley), np.asarray(cayley), backend='numpy', silencioso=True)
+
+def invariantes_baratos(cayley):
+	'''Retorna (n, abeliano, |Z(G)|, ((orden, cantidad de elementos), ...)), o None si la tabla no define un grupo
+	(incluidas las tablas que ni siquiera son cuadradas).'''
+	try:
+		grupo = grupo_silencioso(cayley)
+	except ValueError:
+		return None
+	if not grupo.es_grupo:
+		return None
+	tabla = grupo.tabla
+	centro = int((tabla == tabla.T).all(axis=1).sum()) # z está en el centro si su fila es igual a su columna
+	ordenes, cantidades = np.unique(grupo.ordenes, return_counts=True)
+	return grupo.n, grupo.abeliano, centro, tuple(zip(ordenes.tolist(), cantidades.tolist()))
+
+def conteo_de_subgrupos(cayley):
+	# ((orden, cantidad de subgrupos de ese orden), ...), a partir del retículo de Grupo.subgrupos()
+	conteo = collections.Counter(H.bit_count() for H in grupo_silencioso(cayley).subgrupos())
+	return tuple(sorted(conteo.items()))
+
+def generado(tabla, neutro, generadores):
+	# Set con los elementos del subgrupo generado, recorriéndolo en anchura desde e
+	vistos = {neutro}
+	recorrido = [neutro]
+	for x in recorrido: # recorrido crece mientras lo recorremos
+		for g in generadores:
+			y = tabla[x][g]
+			if y not in vistos:
+				vistos.add(y)
+				recorrido.append(y)
+	return vistos
+
+def tuplas_generadoras(tabla, neutro, d):
+	'''Generador de todas las tuplas (g1, ..., gd) que generan el grupo. En una tupla generadora de largo mínimo ningún
+	gi está en el subgrupo generado por los anteriores (si no, sobraría), así que esas ramas se cortan de inmediato.'''
+	n = len(tabla)
+	def extender(prefijo, subgrupo):
+		if len(prefijo) == d:
+			if len(subgrupo) == n:
+				yield prefijo
+			return
+		for g in range(n):
+			if g not in subgrupo:
+				yield from extender(prefijo + [g], generado(tabla, neutro, prefijo + [g]))
+	yield from extender([], {neutro})
+
+def tabla_de_generadores(tabla, neutro, generadores, cota=None):
+	'''Recorre el grupo en anchura desde e, operando por la derecha con los generadores en orden, y numera los elementos
+	según el orden en que aparecen. Retorna la lista con la etiqueta de x * gj para cada x (en ese orden) y cada j.
+	Esa tabla de n x d determina la tabla de Cayley completa (todo y es una palabra en los generadores, y x * y se
+	obtiene siguiendo la palabra desde x), así que basta compararla a ella. Si se da una cota y la tabla resulta mayor
+	en orden lexicográfico, se abandona apenas se nota y se retorna None.'''
+	etiqueta = {neutro: 0}
+	recorrido = [neutro]
+	resultado = []
+	for x in recorrido:
+		for g in generadores:
+			y = tabla[x][g]
+			if y not in etiqueta:
+				etiqueta[y] = len(recorrido)
+				recorrido.append(y)
+			resultado.append(etiqueta[y])
+		if cota is not None:
+			fila, fila_cota = resultado[-len(generadores):], cota[len(resultado) - len(generadores):len(resultado)]
+			if fila > fila_cota:
+				return None
+			if fila < fila_cota:
+				cota = None # Ya es menor, no hace falta seguir comparando
+	return resultado
+
+def forma_canonica(cayley) -> tuple:
+	'''La menor tabla de generadores entre todas las tuplas generadoras de largo mínimo d, junto con d. Buscamos d
+	probando d = 0, 1, 2, ...; como cada generador nuevo al menos duplica el subgrupo generado, d es a lo más log2(n).'''
+	grupo = grupo_silencioso(cayley)
+	tabla, neutro = grupo.tabla.tolist(), grupo.neutro
+	d = 0
+	while next(tuplas_generadoras(tabla, neutro, d), None) is None:
+		d += 1
+	mejor = None
+	for generadores in tuplas_generadoras(tabla, neutro, d):
+		candidata = tabla_de_generadores(tabla, neutro, generadores, mejor)
+		if candidata is not None:
+			mejor = candidata
+	return d, tuple(mejor)
+
+def aplicar(funcion, tablas, procesos):
+	# Aplica funcion a cada tabla, en este proceso o repartiendo las tablas en un pool
+	if procesos == 1:
+		return [funcion(tabla) for tabla in tablas]
+	with multiprocessing.Pool(procesos) as pool:
+		return pool.map(funcion, tablas, chunksize=max(1, len(tablas) // (4 * procesos)))
+
+def refinar(baldes, funcion, tablas, procesos):
+	'''Parte cada balde con más de una tabla según el valor de funcion en sus tablas; los baldes de una sola tabla ya
+	son una clase y no se vuelven a mirar.'''
+	chocan = [indice for balde in baldes if len(balde) > 1 for indice in balde]
+	valores = dict(zip(chocan, aplicar(funcion, [tablas[indice] for indice in chocan], procesos)))
+	refinados = []
+	for balde in baldes:
+		if len(balde) == 1:
+			refinados.append(balde)
+			continue
+		partes = collections.defaultdict(list)
+		for indice in balde:
+			partes[valores[indice]].append(indice)
+		refinados.extend(partes.values())
+	return refinados
+
+def clasificar(tablas, procesos=None):
+	'''Agrupa las tablas de Cayley (listas de listas o arreglos) en clases de isomorfismo. Retorna (clases, no_grupos):
+	clases es una lista de listas con los índices de las tablas de cada clase, y no_grupos los índices de las tablas
+	que no definen un grupo.'''
+	tablas = list(tablas)
+	procesos = procesos or os.cpu_count() or 1
+
+	baldes = collections.defaultdict(list)
+	no_grupos = []
+	for indice, invariantes in enumerate(aplicar(invariantes_baratos, tablas, procesos)):
+		if invariantes is None:
+			no_grupos.append(indice)
+		else:
+			baldes[invariantes].append(indice)
+
+	# invariantes[1] es el flag de abeliano: esos baldes ya son clases de isomorfismo
+	abelianos = [balde for invariantes, balde in baldes.items() if invariantes[1]]
+	clases = refinar([balde for invariantes, balde in baldes.items() if not invariantes[1]], conteo_de_subgrupos,
+		tablas, procesos)
+	clases = refinar(clases, forma_canonica, tablas, procesos)
+	return sorted(abelianos + clases), no_grupos
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Clasifica tablas de Cayley salvo isomorfismo.")
+	parser.add_argument('tablas', help='archivo con una tabla de Cayley por línea, en JSON (lista de listas)')
+	parser.add_argument('--procesos', type=int)
+	argumentos = parser.parse_args()
+
+	with open(argumentos.tablas) as archivo:
+		tablas = [json.loads(linea) for linea in archivo if linea.strip()]
+	clases, no_grupos = clasificar(tablas, argumentos.procesos)
+	for numero, clase in enumerate(clases):
+		print(f"clase {numero} (orden {len(tablas[clase[0]])}): {len(clase)} tablas, {clase}")
+	if no_grupos:
+		print(f"no definen un grupo: {no_grupos}")
@@ -0,0 +1,221 @@
+# Grupos de permutaciones dados por generadores, sin armar nunca la tabla de Cayley (que para grupos de orden 10^6
+# o más no entra en memoria). Con el algoritmo de Schreier-Sims se calcula una base B = (b1, ..., bk) y un conjunto
+# generador fuerte: para cada nivel i, generadores del estabilizador G(i) de b1, ..., b(i-1), y la órbita de bi bajo
+# G(i) con un representante u (una permutación que lleva bi a ese punto) para cada punto de la órbita.
+# Con eso:
+# - |G| es el producto de los largos de las órbitas.
+# - g pertenece a G si al "tamizarlo" (dividirlo nivel por nivel por el representante que corresponde) queda la
+#   identidad.
+# Las permutaciones son tuplas p de largo m (el grado) con p[x] la imagen de x, y el producto p * q aplica primero p
+# y después q, es decir (p * q)[x] = q[p[x]].
+import functools
+import itertools
+import random
+
+def producto(p, q):
+	return tuple(q[x] for x in p)
+
+def inversa(p):
+	resultado = [0] * len(p)
+	for x, y in enumerate(p):
+		resultado[y] = x
+	return tuple(resultado)
+
+class GrupoDePermutaciones:
+	def __init__(self, generadores, grado=None, silencioso=False, deterministico=False, confianza=40, semilla=None):
+		'''generadores es una lista de permutaciones (secuencias con la imagen de cada punto 0..m-1). Si no hay
+		generadores, hay que indicar el grado m. Con silencioso=True no se imprime nada.
+		Por defecto la base y los generadores fuertes se arman con la versión aleatoria de Schreier-Sims, que termina
+		cuando confianza elementos al azar seguidos se reducen a la identidad: si la estructura estuviera incompleta,
+		cada uno lo haría con probabilidad a lo más 1/2, así que la probabilidad de error es a lo más 2^-confianza.
+		Con deterministico=True, además se verifican todos los generadores de Schreier, y el resultado es seguro.'''
+		self.generadores = [tuple(g) for g in generadores]
+		if grado is None and not self.generadores:
+			raise ValueError("Sin generadores hay que indicar el grado")
+		self.grado = len(self.generadores[0]) if grado is None else grado
+		if any(sorted(g) != list(range(self.grado)) for g in self.generadores):
+			raise ValueError(f"Los generadores deben ser permutaciones de 0..{self.grado - 1}")
+		self.neutro = tuple(range(self.grado))
+		self.es_grupo = True # Las permutaciones con la composición siempre forman un grupo
+		self.silencioso = silencioso
+		self.base = []
+		self.fuertes = [] # fuertes[i]: generadores fuertes que fijan base[0..i-1]
+		self.orbitas = [] # orbitas[i]: punto de la órbita de base[i] -> representante
+		self.inversas = [] # inversas[i]: punto de la órbita de base[i] -> inversa del representante
+		self.pendientes = [] # pendientes[i]: pares (x, s) cuyo generador de Schreier todavía no se tamizó
+		self.aleatorio = random.Random(semilla)
+		self.schreier_sims(deterministico, confianza)
+
+
+	def mostrar(self, mensaje):
+		if not self.silencioso:
+			print(mensaje)
+
+
+	def tamizar(self, g, inicio=0):
+		'''Divide g nivel por nivel: si g lleva base[i] a un punto de la órbita, lo multiplicamos por la inversa del
+		representante de ese punto, y el resultado fija base[i]. Retorna (lo que queda de g, nivel en que se detuvo);
+		g pertenece al grupo si y sólo si queda la identidad después de pasar por todos los niveles. Con inicio > 0 se
+		asume que g ya fija los puntos base anteriores.'''
+		for i in range(inicio, len(self.base)):
+			punto = g[self.base[i]]
+			if punto not in self.orbitas[i]:
+				return g, i
+			g = producto(g, self.inversas[i][punto])
+		return g, len(self.base)
+
+
+	def agregar_nivel(self, punto):
+		self.base.append(punto)
+		self.fuertes.append([])
+		self.orbitas.append({punto: self.neutro})
+		self.inversas.append({punto: self.neutro})
+		self.pendientes.append([])
+
+
+	def agregar_generador(self, h, nivel):
+		'''Agrega h a los generadores fuertes del nivel y extiende la órbita sin cambiar los representantes que ya
+		estaban, así los generadores de Schreier ya tamizados siguen valiendo. Quedan pendientes los pares (x, h) para
+		toda la órbita, y los (x, s) de los puntos nuevos con los demás generadores.'''
+		fuertes, orbita, inversas = self.fuertes[nivel], self.orbitas[nivel], self.inversas[nivel]
+		fuertes.append(h)
+		nuevos = []
+		for x in list(orbita): # Primero, lo que se alcanza con h desde la órbita vieja
+			y = h[x]
+			if y not in orbita:
+				orbita[y] = producto(orbita[x], h)
+				inversas[y] = inversa(orbita[y])
+				nuevos.append(y)
+		for x in nuevos: # nuevos crece mientras lo recorremos: en anchura con todos los generadores
+			for s in fuertes:
+				y = s[x]
+				if y not in orbita:
+					orbita[y] = producto(orbita[x], s)
+					inversas[y] = inversa(orbita[y])
+					nuevos.append(y)
+		self.pendientes[nivel].extend((x, h) for x in orbita)
+		self.pendientes[nivel].extend((x, s) for x in nuevos for s in fuertes[:-1])
+
+
+	def elementos_al_azar(self):
+		'''Generador infinito de elementos casi uniformes del grupo, con el algoritmo de reemplazo de productos: se
+		mantiene una lista de elementos, en cada paso uno de ellos se reemplaza por su producto con otro y se acumula
+		en x. Los primeros pasos se descartan para que la lista se mezcle.'''
+		lista = [self.generadores[i % len(self.generadores)] for i in range(max(10, len(self.generadores)))]
+		x = self.neutro
+		for paso in itertools.count():
+			i, j = self.aleatorio.sample(range(len(lista)), 2)
+			lista[i] = producto(lista[i], lista[j])
+			x = producto(x, lista[i])
+			if paso >= 50:
+				yield x
+
+
+	def schreier_sims(self, deterministico, confianza):
+		'''Algoritmo de Schreier-Sims. Por el lema de Schreier, el estabilizador de base[i]
+		en G(i) está generado por los u_x * s * u_(s(x))^-1, con x en la órbita y s generador del nivel. Cada par (x, s)
+		se tamiza una sola vez: los representantes nunca cambian, así que un generador de Schreier que ya se redujo a la
+		identidad sigue reduciéndose cuando los niveles de abajo crecen. Si alguno no se reduce, lo que queda es un
+		elemento nuevo de los niveles de más abajo: lo agregamos a los niveles nivel+1..hasta (los que fija) y seguimos
+		por el más bajo. Empezamos por el nivel más bajo y subimos: cuando un nivel se queda sin pendientes, todos los de
+		más abajo ya están completos.
+		Verificar todos los pares cuesta del orden de (suma de |órbita| * |generadores| de cada nivel) tamizados, que
+		para grupos grandes como S_100 son demasiados. Por eso primero se hace la versión aleatoria: se tamizan
+		elementos al azar y lo que quede de ellos se agrega como generador fuerte, hasta que confianza seguidos se
+		reducen a la identidad. Si no se pide la versión determinística, ahí termina.'''
+		generadores = [g for g in self.generadores if g != self.neutro]
+		if not generadores:
+			return
+		self.agregar_nivel(next(x for x in range(self.grado) if generadores[0][x] != x))
+		for g in generadores:
+			self.agregar_generador(g, 0)
+
+		seguidos = 0
+		for g in self.elementos_al_azar():
+			if seguidos >= confianza:
+				break
+			resto, hasta = self.tamizar(g)
+			if resto == self.neutro:
+				seguidos += 1
+				continue
+			seguidos = 0
+			if hasta == len(self.base):
+				self.agregar_nivel(next(y for y in range(self.grado) if resto[y] != y))
+			for nivel_nuevo in range(1, hasta + 1): # El nivel 0 ya tiene la órbita completa
+				self.agregar_generador(resto, nivel_nuevo)
+		if not deterministico:
+			self.pendientes = [[] for _ in self.base]
+			return
+
+		nivel = len(self.base) - 1 # Desde el nivel más bajo hacia arriba: la fase aleatoria dejó pendientes en todos
+		while nivel >= 0:
+			if not self.pendientes[nivel]:
+				nivel -= 1
+				continue
+			x, s = self.pendientes[nivel].pop()
+			# Generador de Schreier: lleva base[nivel] a x, luego a s(x), y vuelve a base[nivel]
+			schreier = producto(producto(self.orbitas[nivel][x], s), self.inversas[nivel][s[x]])
+			resto, hasta = self.tamizar(schreier, nivel + 1)
+			if resto == self.neutro:
+				continue
+			if hasta == len(self.base): # resto fija toda la base: necesitamos un punto base nuevo que mueva
+				self.agregar_nivel(next(y for y in range(self.grado) if resto[y] != y))
+			for nivel_nuevo in range(nivel + 1, hasta + 1):
+				self.agregar_generador(resto, nivel_nuevo)
+			nivel = hasta # Seguimos revisando desde el nivel más bajo que cambió
+		assert all(not pendientes for pendientes in self.pendientes)
+
+
+	@functools.cached_property
+	def orden(self) -> int:
+		orden = 1
+		for representantes in self.orbitas:
+			orden *= len(representantes)
+		return orden
+
+
+	@property
+	def n(self) -> int:
+		return self.orden # Igual que en Grupo, n es la cantidad de elementos del grupo
+
+
+	def contiene(self, permutacion) -> bool:
+		permutacion = tuple(permutacion)
+		if sorted(permutacion) != list(range(self.grado)):
+			return False
+		resto, _ = self.tamizar(permutacion)
+		return resto == self.neutro
+
+	__contains__ = contiene
+
+
+	def es_abeliano(self) -> bool:
+		# G es abeliano si y sólo si sus generadores conmutan entre sí
+		for i, g in enumerate(self.generadores):
+			for h in self.generadores[i + 1:]:
+				if producto(g, h) != producto(h, g):
+					self.mostrar("El grupo NO ES ABELIANO")
+					return False
+		return True
+
+
+	@functools.cached_property
+	def abeliano(self) -> bool:
+		return self.es_abeliano()
+
+
+	def es_subgrupo(self, elementos):
+		if self.es_subgrupo_without_prints(elementos):
+			self.mostrar("sí") # Igual que Grupo.es_subgrupo
+			return True
+		self.mostrar("no")
+		return False
+
+
+	def es_subgrupo_without_prints(self, elementos):
+		'''elementos es una colección de permutaciones. Es subgrupo si todas pertenecen a G (por tamizado), contiene al
+		neutro y es cerrado bajo el producto; como es finito, la clausura ya garantiza los inversos.'''
+		elementos = {tuple(p) for p in elementos}
+		if self.neutro not in elementos or not all(self.contiene(p) for p in elementos):
+			return False
+		return all(producto(p, q) in elementos for p in elementos for q in elementos)
@@ -1,15 +1,183 @@
+import functools
+import math
+import os
+import struct
 from itertools import combinations
 
+import numpy as np
+
+# Cantidad de filas de la tabla que se comparan de una vez en los chequeos vectorizados, para que los arreglos
+# temporales (máscaras booleanas, transpuestas) no ocupen n^2 bytes extra cuando n es grande.
+ELEMENTOS_POR_BLOQUE = 2**24
+# Lado de los cuadrados en que se compara la tabla con su transpuesta; chico para que la transpuesta entre en caché.
+LADO_DE_CUADRADO = 512
+
+def tipo_para(n):
+	# El tipo entero sin signo más chico que puede guardar los elementos 0..n-1
+	for tipo in (np.uint8, np.uint16, np.uint32):
+		if n - 1 <= np.iinfo(tipo).max:
+			return tipo
+	return np.uint64
+
+def tabla_compacta(cayley, n):
+	'''Convierte la tabla de Cayley (listas o arreglo) en un arreglo de n x n. Si todos los elementos están entre 0 y
+	n-1 se guarda con el tipo de tipo_para(n); si no, se deja como viene para que is_closed lo detecte.
+	Las tablas abiertas con abrir_tabla (np.memmap) se dejan tal cual, sin recorrerlas.'''
+	tabla = cayley if isinstance(cayley, np.memmap) else np.asarray(cayley)
+	if tabla.shape != (n, n):
+		raise ValueError(f"La tabla de Cayley debe ser de {n} x {n}")
+	if isinstance(tabla, np.memmap):
+		return tabla
+	if tabla.size and tabla.min() >= 0 and tabla.max() <= n - 1:
+		return tabla.astype(tipo_para(n), copy=False)
+	return tabla
+
+def bloques_de_filas(n):
+	# Rangos (inicio, fin) de filas que suman a lo más ELEMENTOS_POR_BLOQUE elementos de la tabla
+	paso = max(1, ELEMENTOS_POR_BLOQUE // max(n, 1))
+	for inicio in range(0, n, paso):
+		yield inicio, min(n, inicio + paso)
+
+# Formato binario de tablas de Cayley: un encabezado de TAMANO_ENCABEZADO bytes con la firma, n y los bytes por
+# elemento, seguido de las n x n entradas fila por fila, como enteros sin signo little-endian del tipo de tipo_para(n).
+FIRMA_TABLA = b'CAYLEY01'
+ENCABEZADO_TABLA = struct.Struct('<8sQB15x')
+TAMANO_ENCABEZADO = ENCABEZADO_TABLA.size
+
+def guardar_tabla(cayley, ruta):
+	'''Convierte una tabla de Cayley (listas anidadas, o cualquier secuencia de filas) al formato binario, escribiendo
+	de a una fila para no armar otra copia completa en memoria.'''
+	n = len(cayley)
+	tipo = np.dtype(tipo_para(n)).newbyteorder('<')
+	with open(ruta, 'wb') as archivo:
+		archivo.write(ENCABEZADO_TABLA.pack(FIRMA_TABLA, n, tipo.itemsize))
+		for fila in cayley:
+			fila = np.asarray(fila, dtype=np.int64)
+			if len(fila) != n:
+				raise ValueError(f"La tabla de Cayley debe ser de {n} x {n}")
+			if n and (fila.min() < 0 or fila.max() > np.iinfo(tipo).max):
+				raise ValueError(f"La tabla tiene elementos que no se pueden guardar como {tipo.name}")
+			archivo.write(fila.astype(tipo).tobytes())
+
+def abrir_tabla(ruta):
+	# Retorna (n, tabla) con la tabla como np.memmap de sólo lectura: las filas se leen del disco a medida que se usan
+	with open(ruta, 'rb') as archivo:
+		firma, n, bytes_por_elemento = ENCABEZADO_TABLA.unpack(archivo.read(TAMANO_ENCABEZADO))
+	if firma != FIRMA_TABLA:
+		raise ValueError(f"{ruta} no es una tabla de Cayley en formato binario")
+	tipo = np.dtype(tipo_para(n)).newbyteorder('<')
+	if bytes_por_elemento != tipo.itemsize or os.path.getsize(ruta) != TAMANO_ENCABEZADO + n * n * tipo.itemsize:
+		raise ValueError(f"El tamaño de {ruta} no corresponde a una tabla de {n} x {n}")
+	if n == 0:
+		return n, np.zeros((0, 0), dtype=tipo)
+	return n, np.memmap(ruta, dtype=tipo, mode='r', offset=TAMANO_ENCABEZADO, shape=(n, n))
+
+def mascara_a_bits(mascara) -> int:
+	# Subconjunto como entero: el bit i está encendido si el elemento i pertenece al subconjunto
+	return int.from_bytes(np.packbits(mascara, bitorder='little').tobytes(), 'little')
+
+def bits_a_mascara(bits: int, n):
+	datos = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+	return np.unpackbits(datos, count=n, bitorder='little').astype(bool)
+
+def elementos_de(bits: int) -> list:
+	# Los elementos de un subconjunto guardado como entero, en orden creciente
+	elementos = []
+	while bits:
+		menor = bits & -bits
+		elementos.append(menor.bit_length() - 1)
+		bits ^= menor
+	return elementos
+
 class Grupo:
-	def __init__(self, num, cayley):
+	def __init__(self, num, cayley, backend=None, silencioso=False):
+		'''backend puede ser 'listas' (la tabla se recorre elemento a elemento) o 'numpy' (la tabla se guarda como un
+		arreglo compacto y las propiedades se comprueban con operaciones sobre el arreglo completo). Por defecto se
+		usa 'numpy' si cayley ya es un arreglo de NumPy.
+		Crear el objeto no calcula nada: neutro, es_grupo, abeliano, inversos y ordenes se calculan la primera vez que
+		se piden y quedan guardados. Con silencioso=True no se imprime nada.'''
 		self.n = num
-		self.cayley = cayley
-		self.neutro = self.elemento_neutro()
-		self.es_grupo = self.es_grupo()
-		self.abeliano = self.es_abeliano()
+		if backend is None:
+			backend = 'numpy' if isinstance(cayley, np.ndarray) else 'listas'
+		self.tabla = tabla_compacta(cayley, num) if backend == 'numpy' else None
+		self.cayley = cayley if self.tabla is None else self.tabla
+		self.silencioso = silencioso
+
+
+	@classmethod
+	def desde_archivo(cls, ruta, silencioso=False):
+		'''Abre una tabla guardada con guardar_tabla como np.memmap, con el backend 'numpy'. Todos los chequeos recorren
+		la tabla por bloques de filas (ver bloques_de_filas), así que la memoria no depende de n.'''
+		n, tabla = abrir_tabla(ruta)
+		return cls(n, tabla, backend='numpy', silencioso=silencioso)
+
+
+	@classmethod
+	def desde_permutaciones(cls, generadores, grado=None, silencioso=False):
+		'''Constructor alternativo para grupos de permutaciones: retorna un GrupoDePermutaciones (ver permutaciones.py),
+		que responde orden, pertenencia, es_abeliano y es_subgrupo con Schreier-Sims, sin armar la tabla de Cayley.'''
+		from permutaciones import GrupoDePermutaciones # Importado acá porque permutaciones.py no depende de t2.py
+		return GrupoDePermutaciones(generadores, grado, silencioso)
+
+
+	def mostrar(self, mensaje):
+		if not self.silencioso:
+			print(mensaje)
+
+
+	@functools.cached_property
+	def neutro(self) -> int | None:
+		return self.elemento_neutro()
+
+
+	@functools.cached_property
+	def abeliano(self) -> bool:
+		return self.es_abeliano()
+
+
+	@functools.cached_property
+	def inversos(self):
+		'''Arreglo con el inverso de cada elemento (el b con a * b = b * a = e), o -1 si no tiene. Se buscan los pares
+		(a, b) con a * b = e en la máscara de e, bloque por bloque, y nos quedamos con los que además cumplen b * a = e.'''
+		tabla = self.tabla_numpy()
+		inversos = np.full(self.n, -1, dtype=np.int64)
+		if self.neutro is None:
+			return inversos
+		for inicio, fin in bloques_de_filas(self.n):
+			pares = np.argwhere(tabla[inicio:fin] == self.neutro)
+			pares[:, 0] += inicio
+			validos = pares[tabla[pares[:, 1], pares[:, 0]] == self.neutro]
+			inversos[validos[:, 0]] = validos[:, 1]
+		return inversos
+
+
+	@functools.cached_property
+	def ordenes(self):
+		'''Arreglo con el orden de cada elemento del grupo: el menor k >= 1 con a^k = e. Calculamos las potencias de
+		todos los elementos a la vez, operando cada potencia con su base, y vamos sacando los que ya llegaron a e.'''
+		if not self.es_grupo:
+			raise ValueError("La tabla de Cayley no define un grupo")
+		tabla = self.tabla_numpy()
+		ordenes = np.zeros(self.n, dtype=np.int64)
+		bases = np.arange(self.n)
+		potencias = bases.copy()
+		k = 1
+		while len(bases):
+			listos = potencias == self.neutro
+			ordenes[bases[listos]] = k
+			bases, potencias = bases[~listos], potencias[~listos]
+			potencias = tabla[potencias, bases]
+			k += 1
+		return ordenes
 
 
 	def is_closed(self):
+		if self.tabla is not None: # Basta con mirar el mínimo y el máximo de la tabla, bloque por bloque
+			for inicio, fin in bloques_de_filas(self.n):
+				bloque = self.tabla[inicio:fin]
+				if bloque.min() < 0 or bloque.max() > self.n - 1:
+					return False
+			return True
 		for row, col in enumerate(self.cayley):
 			for element in col:
 				# Cada elemento es como mínimo 0, y como máximo n-1 (que es self.n -1)
@@ -18,20 +186,70 @@ class Grupo:
 		return True
 
 
-	def is_associative(self) -> bool:
-		# Comprobar la asociatividad: (a * b) * c == a * (b * c)
-		for a in range(self.n):
-			for b in range (self.n):
-				for c in range(self.n):
-					# Primero calculamos (a * b) * c
-					ab_left = self.cayley[a][b] # (a * b)
-					abc_left = self.cayley[ab_left][c] # (a * b) * c
-					# Luego calculamos a * (b * c)
-					bc_right = self.cayley[b][c] # (b * c)
-					abc_right = self.cayley[a][bc_right] # a * (b * c)
-					# Comparamos los dos resultados
-					if abc_left != abc_right:
+	def tabla_numpy(self):
+		# La tabla de Cayley como arreglo de NumPy; con el backend de listas se convierte una sola vez
+		if self.tabla is not None:
+			return self.tabla
+		if getattr(self, '_tabla', None) is None:
+			self._tabla = tabla_compacta(self.cayley, self.n)
+		return self._tabla
+
+
+	def clausura(self, elementos):
+		'''Retorna una máscara booleana con los productos ((x1 * x2) * x3) * ... de elementos, es decir, el menor
+		subconjunto que contiene a elementos y es cerrado al operar por la derecha con ellos. En un grupo finito es
+		justamente el subgrupo generado. Es una búsqueda en anchura: a los elementos nuevos de cada vuelta los operamos
+		con todos los generadores de una vez, juntando las columnas de sus filas en la tabla.'''
+		tabla = self.tabla_numpy()
+		generadores = np.unique(np.asarray(list(elementos), dtype=np.intp))
+		mascara = np.zeros(self.n, dtype=bool)
+		mascara[generadores] = True
+		frontera = generadores
+		while len(frontera):
+			productos = np.unique(tabla[np.ix_(frontera, generadores)])
+			frontera = productos[~mascara[productos]]
+			mascara[frontera] = True
+		return mascara
+
+
+	def conjunto_generador(self) -> list:
+		'''Arma un conjunto generador agregando, uno a uno, elementos que todavía no están en la clausura de los
+		anteriores. En un grupo cada elemento nuevo al menos duplica el tamaño de la clausura (por Lagrange), así que
+		quedan a lo más log2(n) generadores.'''
+		generadores = []
+		generado = np.zeros(self.n, dtype=bool)
+		for x in range(self.n):
+			if not generado[x]:
+				generadores.append(x)
+				generado = self.clausura(generadores)
+		return generadores
+
+
+	def is_associative(self, modo='light') -> bool:
+		'''Comprueba la asociatividad: (a * b) * c == a * (b * c).
+		Con modo='light' usamos el test de Light: si b cumple (a * b) * c == a * (b * c) para todo a, c, y b' también,
+		entonces b * b' también lo cumple, así que basta revisar los b de un conjunto generador (como la clausura se
+		arma con productos de generadores, vale aunque la tabla no sea asociativa). Para cada generador g
+		comparamos las tablas (x * g) * y y x * (g * y) completas, que cuesta O(n^2) por generador.
+		Con modo='exhaustivo' se revisan las n^3 ternas, una fila a por vez, para verificar.'''
+		if not self.is_closed():
+			return False # Sin clausura, la operación ni siquiera está definida dentro de G
+		tabla = self.tabla_numpy()
+
+		if modo == 'exhaustivo':
+			for a in range(self.n):
+				# Fila a de ambos lados: (a * b) * c es tabla[tabla[a, b], c], y a * (b * c) es tabla[a, tabla[b, c]]
+				for inicio, fin in bloques_de_filas(self.n):
+					if not np.array_equal(tabla[tabla[a, inicio:fin]], tabla[a][tabla[inicio:fin]]):
 						return False
+			return True
+
+		for g in self.conjunto_generador():
+			# (x * g) * y en la posición [x, y], contra x * (g * y), por bloques de filas x
+			columnas = tabla[g].astype(np.intp)
+			for inicio, fin in bloques_de_filas(self.n):
+				if not np.array_equal(tabla[tabla[inicio:fin, g]], np.take(tabla[inicio:fin], columnas, axis=1)):
+					return False
 		return True
 
 	def has_identity_element(self) -> bool:
@@ -46,6 +264,16 @@ class Grupo:
 		# El elemento neutro es tal que, para todo a en G, e * a = a * e = a. Es decir, deja cada elemento tal cual,
 		# ya sea si se aplica la operación a la izquierda o a la derecha de dicho elemento.
 
+		if self.tabla is not None:
+			# Candidatos: los e con e * 0 = 0 y 0 * e = 0; después comparamos su fila y su columna contra 0..n-1
+			if self.n == 0:
+				return None
+			elementos = np.arange(self.n)
+			candidatos = np.flatnonzero((self.tabla[:, 0] == 0) & (self.tabla[0, :] == 0))
+			neutros = [int(e) for e in candidatos
+					if np.array_equal(self.tabla[e], elementos) and np.array_equal(self.tabla[:, e], elementos)]
+			return neutros[0] if len(neutros) == 1 else None
+
 		possible_identities = [] # Si existe más de un supuesto elemento neutro, no es grupo!
 
 		for e in range(self.n):
@@ -66,6 +294,9 @@ class Grupo:
 		if identity_element is None:
 			return False # Si no existe el elemento neutro, no puede existir inversa para los elementos del grupo.
 
+		if self.tabla is not None:
+			return bool((self.inversos >= 0).all())
+
 		for a in range(self.n):
 			has_inverse = False # Ponemos False a cada nuevo elemento a que consideremos, si lo encontramos cambia a True.
 			for b in range(self.n):
@@ -78,6 +309,7 @@ class Grupo:
 
 
 	# Tetorna false si la tabla cayley no define a un grupo, sino true
+	@functools.cached_property
 	def es_grupo(self) -> bool:
 		'''Para que una tabla de Cayley defina un grupo, se deben cumplir 4 propiedades de grupo:
 		1 - Clausura: Para todo a, b en G, el resultado de la operacion a * b tambien esta en G
@@ -86,18 +318,18 @@ class Grupo:
 		4 - Elemento inverso: Para cada a en G, existe un elemento b en G tal que a * b = b * a = e'''
   
 		if not self.is_closed(): # Propiedad 1: Clausura sobre el conjunto.
-			print("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad de Clausura")
+			self.mostrar("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad de Clausura")
 			return False
 		if not self.is_associative(): # Propiedad 2: Asociatividad
-			print("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad de Asociatividad")
+			self.mostrar("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad de Asociatividad")
 			return False
 		if not self.has_identity_element(): # Propiedad 3: Elemento neutro
-			print("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad del Elemento neutro")
+			self.mostrar("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad del Elemento neutro")
 			return False
 		if not self.has_inverse_elements(): # Propiedad 4: Elemento inverso
-			print("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad del Elemento inverso")
+			self.mostrar("La tabla de Cayley NO DEFINE UN GRUPO, falla la propiedad del Elemento inverso")
 			return False
-		print("La tabla de Cayley DEFINE UN GRUPO, cumple las 4 propiedades.")
+		self.mostrar("La tabla de Cayley DEFINE UN GRUPO, cumple las 4 propiedades.")
 		return True
 
 
@@ -107,90 +339,82 @@ class Grupo:
 		pero también se puede ver como que la tabla de Cayley es simétrica respecto a la diagonal.'''
   
 		if not self.es_grupo:
-			print("No tiene sentido preguntar si es abeliano, porque NO ES UN GRUPO")
+			self.mostrar("No tiene sentido preguntar si es abeliano, porque NO ES UN GRUPO")
 			return False
 
+		if self.tabla is not None:
+			# La tabla tiene que ser igual a su transpuesta. La comparamos por cuadrados de lado*lado: cada cuadrado
+			# sobre la diagonal con el transpuesto del simétrico, leyendo ambos por filas (así una tabla en disco se
+			# lee en tramos contiguos y no columna por columna)
+			lado = LADO_DE_CUADRADO
+			for i in range(0, self.n, lado):
+				for j in range(i, self.n, lado):
+					if not np.array_equal(self.tabla[i:i + lado, j:j + lado], self.tabla[j:j + lado, i:i + lado].T):
+						self.mostrar("El grupo NO ES ABELIANO")
+						return False
+			return True
+
 		for a in range(self.n):
 			for b in range(self.n):
 				if self.cayley[a][b] != self.cayley[b][a]:
 					# Si operar a con b no es igual que operar b con a, no es abeliano (no es conmutativo para todo a,b in G).
-					print("El grupo NO ES ABELIANO")
+					self.mostrar("El grupo NO ES ABELIANO")
 					return False
 		return True
 
 
+	def mascara(self, elementos):
+		'''Convierte un subconjunto de G (lista o set de elementos, máscara booleana de largo n, o entero usado como
+		bitset) en una máscara booleana. Retorna None si algún elemento no está entre 0 y n-1.'''
+		if isinstance(elementos, int):
+			return bits_a_mascara(elementos, self.n) if 0 <= elementos < (1 << self.n) else None
+		if isinstance(elementos, np.ndarray) and elementos.dtype == bool:
+			return elementos if elementos.shape == (self.n,) else None
+		indices = np.asarray(list(elementos), dtype=np.int64)
+		if len(indices) and (indices.min() < 0 or indices.max() > self.n - 1):
+			return None
+		mascara = np.zeros(self.n, dtype=bool)
+		mascara[indices] = True
+		return mascara
+
+
 	# Recibe un conjunto de elementos del grupo (dado en la variable elementos), y decide si
 	# estos elementos forman un subgrupo de nuestro grupo; se imprime si/no
 	def es_subgrupo(self, elementos):
-     # Hay un axioma que dice que todo subgrupo contiene el elemento neutro del grupo que lo contiene, así que buscamos
-     # si existe ese elemento neutro de G en el supuesto subgrupo H
-		has_identity_element = False
-  
-		for elem in elementos:
-			if elem < 0 or elem > (self.n-1):
-				print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-				return False
-		if self.neutro not in elementos:
-			print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-			return False
-		else:
-			has_identity_element = True
-
-		for elem in elementos: # Buscamos el inverso de elem en el conjunto de elementos dados
-			has_inverse = False
-			for candidate in elementos:
-				if self.cayley[elem][candidate] == self.neutro == self.cayley[candidate][elem]:
-					has_inverse = True
-					break
-			if has_inverse == False:
-				print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-				return False
+		if self.es_subgrupo_without_prints(elementos):
+			self.mostrar("sí") # Se pidió que imprima "sí" en el PDF del enunciado.
+			return True
+		self.mostrar("no") # Se pidió que imprima "no" en el PDF del enunciado.
+		return False
 
-		for elem in elementos: # Ahora comprobamos que es cerrado bajo la operación del grupo:
-			for other_elem in elementos: # Ya se recorre arriba, con este segundo bucle contamos todas las combinaciones
-				result = self.cayley[elem][other_elem]
-				if result not in elementos:
-					print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-					return False
-    
-		if not has_identity_element:
-			print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-			#print("El conjunto dado NO FORMA UN SUBGRUPO (no contiene el elemento neutro)")
+	def es_subgrupo_without_prints(self, elementos): # MISMA FUNCIÓN QUE LA ANTERIOR, PERO SIN PRINTS QUE MOLESTEN
+		'''elementos puede ser una lista o set de elementos, una máscara booleana o un entero usado como bitset.
+		Recorremos el bloque de la tabla con las filas y columnas de H de a grupos de filas (ver bloques_de_filas), así
+		nunca se arma el bloque completo de |H| x |H|: H es cerrado si todos los productos caen en H (mirando la máscara,
+		que cuesta O(1) por producto), y cada h tiene inverso en H si en su fila hay un k con h * k = e y k * h = e.
+		Si algún producto no está entre 0 y n-1 la tabla no es cerrada, y H tampoco.'''
+		mascara = self.mascara(elementos)
+		# Hay un axioma que dice que todo subgrupo contiene el elemento neutro del grupo que lo contiene, así que
+		# buscamos si existe ese elemento neutro de G en el supuesto subgrupo H
+		if mascara is None or self.neutro is None or not mascara[self.neutro]:
 			return False
-		print("sí") # Se pidió que imprima "sí" en el PDF del enunciado.
-		return True
 
-	def es_subgrupo_without_prints(self, elementos): # MISMA FUNCIÓN QUE LA ANTERIOR, PERO SIN PRINTS QUE MOLESTEN
-     # Hay un axioma que dice que todo subgrupo contiene el elemento neutro del grupo que lo contiene, así que buscamos
-     # si existe ese elemento neutro de G en el supuesto subgrupo H
-		has_identity_element = False
-  
-		for elem in elementos:
-			if elem < 0 or elem > (self.n-1):
+		tabla = self.tabla_numpy()
+		indices = np.flatnonzero(mascara)
+		for inicio, fin in bloques_de_filas(len(indices)):
+			filas = indices[inicio:fin]
+			bloque = tabla[np.ix_(filas, indices)]
+			if bloque.min() < 0 or bloque.max() > self.n - 1: # Antes de usar los productos como índices
 				return False
-		if self.neutro not in elementos:
-			return False
-		else:
-			has_identity_element = True
-
-		for elem in elementos: # Buscamos el inverso de elem en el conjunto de elementos dados
-			has_inverse = False
-			for candidate in elementos:
-				if self.cayley[elem][candidate] == self.neutro == self.cayley[candidate][elem]:
-					has_inverse = True
-					break
-			if has_inverse == False:
+			if not mascara[bloque].all(): # Comprobamos que es cerrado bajo la operación del grupo
+				return False
+			# Buscamos el inverso de cada elemento dentro de H: de los k con h * k = e, alguno con k * h = e
+			h, k = np.nonzero(bloque == self.neutro)
+			validos = tabla[indices[k], filas[h]] == self.neutro
+			con_inverso = np.zeros(len(filas), dtype=bool)
+			con_inverso[h[validos]] = True
+			if not con_inverso.all():
 				return False
-
-		for elem in elementos: # Ahora comprobamos que es cerrado bajo la operación del grupo:
-			for other_elem in elementos: # Ya se recorre arriba, con este segundo bucle contamos todas las combinaciones
-				result = self.cayley[elem][other_elem]
-				if result not in elementos:
-					#print("no") # Se pidió que imprima "no" en el PDF del enunciado.
-					return False
-    
-		if not has_identity_element:
-			return False
 		return True
 
 	def find_combinations(self, elements_or_groups: list, k: int) -> list:
@@ -199,47 +423,80 @@ class Grupo:
 		return [list(c) for c in combinations(elements_or_groups, k)] # Parseamos porque debe retornarse una lista de listas!
 
 
+	def subgrupos(self) -> list:
+		'''Retorna todos los subgrupos de G como bitsets (enteros, ver elementos_de), ordenados por tamaño y luego por
+		sus elementos.
+		Todo subgrupo H es el join (el subgrupo generado por la unión) de los subgrupos cíclicos <h> con h en H, así que
+		partimos de los cíclicos y vamos haciendo el join de cada subgrupo nuevo con cada cíclico, hasta que no aparezca
+		ninguno nuevo. Cada subgrupo se guarda con una lista corta de generadores, para que la clausura sea barata.
+		Por Lagrange, el join de A y <g> tiene un orden que divide a n, es múltiplo de mcm(|A|, |<g>|) y no es menor que
+		|A ∪ <g>|: si el único orden posible es n, el join es G y nos ahorramos la clausura.'''
+		if getattr(self, '_subgrupos', None) is not None:
+			return self._subgrupos
+		if not self.es_grupo:
+			raise ValueError("La tabla de Cayley no define un grupo")
+		divisores = [d for d in range(1, self.n + 1) if self.n % d == 0]
+		todo = (1 << self.n) - 1
+
+		ciclicos = {} # subgrupo cíclico -> un generador
+		for g in range(self.n):
+			ciclicos.setdefault(mascara_a_bits(self.clausura([g])), g)
+
+		encontrados = {H: [g] for H, g in ciclicos.items()} # subgrupo -> generadores
+		pendientes = list(encontrados)
+		while pendientes:
+			A = pendientes.pop()
+			for C, g in ciclicos.items():
+				if A >> g & 1:
+					continue # <g> ya está contenido en A
+				minimo = math.lcm(A.bit_count(), C.bit_count())
+				posibles = [d for d in divisores if d % minimo == 0 and d >= (A | C).bit_count()]
+				if posibles == [self.n]:
+					join = todo
+				else:
+					join = mascara_a_bits(self.clausura(encontrados[A] + [g]))
+				if join not in encontrados:
+					encontrados[join] = encontrados[A] + [g]
+					pendientes.append(join)
+		self._subgrupos = sorted(encontrados, key=lambda H: (H.bit_count(), elementos_de(H)))
+		return self._subgrupos
+
+
 	# Busca si nuestro grupo se puede representar como el producto interno de dos subgrupos
-	# En el caso que si, se imprimen los elementos de los dos subgrupos
-	# En el caso que no, se imprime un mensaje senallando esto
+	# En el caso que si, se imprimen los elementos de los dos subgrupos y se retornan como par de listas
+	# En el caso que no, se imprime un mensaje senallando esto y se retorna None
 	def producto_interno(self):
 
 		if not self.es_grupo:
-			print("No es un grupo, por lo tanto no se puede buscar el producto interno!")
+			self.mostrar("No es un grupo, por lo tanto no se puede buscar el producto interno!")
 			return
 
-		elementos_grupo = list(range(self.n)) # Lista con cantidad de elementos desde 0 hasta n-1
-		neutro_set = {self.neutro} # Set con el elemento neutro
-
-		'''Primero que nada, buscamos todos los subgrupos del grupo G, la idea es genrar todas las
-  		combinaciones posibles entre los elementos del grupo, y para cada combinación, comprobar si es un subgrupo
-    	mediante la función es_subgrupo_without_prints().
-     	Luego, con la lista de subgrupos encontrados, generamos todos los pares posibles (H, K) y 
-      	comprobamos las 3 condiciones del producto interno para cada par. El par que cumpla las tres condiciones, 
-        es un par válido para representar G como producto interno de subgrupos H y K.
-        Es impotante mencionar que los pares generados (H,K) se obtienen mediante la operación propia del grupo G,
-        pero en este caso no está explícita, así que usamos la tabla de Cayley para obtener directamente 
-        los resultados de las operaciones entre elementos de H y K.'''
-        
-		subgrupos_propios = []
-		for n in range(2, self.n): # k=tamaño, desde 2 hasta n-1
-			# Esto porque los subgrupos propios no pueden ser ni el grupo trivial {e} (tamaño 1),
-			# ni el grupo completo G (tamaño n)
-			possible_elements_combinations = self.find_combinations(elementos_grupo, n)
-
-			for subset in possible_elements_combinations:
-				if self.es_subgrupo_without_prints(subset):
-					# Lo guardamos como set para facilitar las operaciones posteriormente, porque un set 
-					# no permite repetidos, y además permite operaciones como intersección, unión, etc:
-					subgrupos_propios.append(set(subset))
+		neutro_bits = 1 << self.neutro # Bitset con el elemento neutro
+		tabla = self.tabla_numpy()
+
+		'''Primero que nada, buscamos todos los subgrupos del grupo G con subgrupos(), que los arma a partir de los
+		subgrupos cíclicos y sus joins en vez de probar todas las combinaciones de elementos, y nos quedamos con los
+		propios: ni el grupo trivial {e} (tamaño 1), ni el grupo completo G (tamaño n).
+		Luego, con la lista de subgrupos encontrados, probamos las 3 condiciones del producto interno para cada par
+		(H, K). El par que cumpla las tres condiciones, es un par válido para representar G como producto interno de
+		subgrupos H y K. Como |H| * |K| tiene que ser |G|, sólo emparejamos H con los subgrupos de tamaño n / |H|.
+		Es impotante mencionar que los pares generados (H,K) se obtienen mediante la operación propia del grupo G,
+		pero en este caso no está explícita, así que usamos la tabla de Cayley para obtener directamente
+		los resultados de las operaciones entre elementos de H y K.'''
+
+		# Los subgrupos vienen como bitsets, así la intersección es un solo AND entre enteros
+		subgrupos_propios = [H for H in self.subgrupos() if 1 < H.bit_count() < self.n]
 
 		if not (len(subgrupos_propios) >= 2):
-			print("No se puede representar como producto interno porque no hay suficientes subgrupos propios.")
+			self.mostrar("No se puede representar como producto interno porque no hay suficientes subgrupos propios.")
 			return
 
-		'''Generamos todos los pares posibles (H, K) de subgrupos propios. Podemos usar la misma función de combinaciones
-  		que antes, pero ahora con size_k=2, porque queremos pares de subgrupos (H, K).'''
-		lista_de_pares_hk = self.find_combinations(subgrupos_propios, 2)
+		# Índices de los subgrupos de cada tamaño, en el mismo orden de la lista
+		por_tamano = {}
+		for indice, H in enumerate(subgrupos_propios):
+			por_tamano.setdefault(H.bit_count(), []).append(indice)
+		lista_de_pares_hk = ((H, subgrupos_propios[j]) for i, H in enumerate(subgrupos_propios)
+			if self.n % H.bit_count() == 0 for j in por_tamano.get(self.n // H.bit_count(), []) if j > i)
 
 		'''Ahora, para cada par (H, K) en la lista de pares, probamos las 3 condiciones del producto interno:
   		1 - |H| * |K| = |G|  (el tamaño del grupo es igual al producto de los tamaños de los subgrupos)
@@ -251,33 +508,25 @@ class Grupo:
 			H, K = par_hk[0], par_hk[1] # Desestructuramos el par en las variables H y K
 
 			'''|H| * |K| = |G|'''
-			if len(H) * len(K) != self.n: # self.n es |G|
+			if H.bit_count() * K.bit_count() != self.n: # self.n es |G|
 				continue # Seguimos al siguiente par (H, K)
 
 			'''H ∩ K = {e}'''
-			if H.intersection(K) != neutro_set:
+			if H & K != neutro_bits:
 				continue # Seguimos al siguiente par (H, K)
 
-			conmutan = True # Asumimos que conmutan, pero si encontramos un par que no lo haga, cambiamos a False
-			'''∀h ∈ H, ∀k ∈ K, h*k = k*h'''
-			for h in H:
-				for k in K:
-					if self.cayley[h][k] != self.cayley[k][h]:
-						conmutan = False 
-						break
-				if not conmutan: # Al llegar aquí, se habrán recorrido todos los k para un h dado
-					break
-			'''Al llegar aquí, se habrán recorrido todos los h en H, por lo que, si conmutan sigue siendo True,
-   			entonces ese par (H, K) cumple las 3 condiciones del producto interno.'''
-			if not conmutan:
+			'''∀h ∈ H, ∀k ∈ K, h*k = k*h: el bloque de la tabla con filas H y columnas K (los h*k) tiene que ser igual
+			al transpuesto del bloque con filas K y columnas H (los k*h)'''
+			elementos_h, elementos_k = elementos_de(H), elementos_de(K)
+			if not np.array_equal(tabla[np.ix_(elementos_h, elementos_k)], tabla[np.ix_(elementos_k, elementos_h)].T):
 				continue
 
-			print("El grupo SE PUEDE REPRESENTAR como producto interno de los subgrupos:")
-			# Los sets en python no tienen orden, así que para que el print aparezca ordenado,
-			# debemos convertir a lista y aplicar una función de ordenamiento:
-			print(f"H = {sorted(list(H))}")
-			print(f"K = {sorted(list(K))}")
-			return
-		print(f"NO se puede representar el grupo como producto interno de dos subgrupos.")
+			self.mostrar("El grupo SE PUEDE REPRESENTAR como producto interno de los subgrupos:")
+			self.mostrar(f"H = {elementos_de(H)}") # elementos_de ya los retorna ordenados
+			self.mostrar(f"K = {elementos_de(K)}")
+			return elementos_de(H), elementos_de(K)
+		self.mostrar(f"NO se puede representar el grupo como producto interno de dos subgrupos.")
 	
-G = Grupo(3,[[0,1,2],[1,2,0],[2,0,1]])
\ No newline at end of file
+if __name__ == "__main__":
+	G = Grupo(3,[[0,1,2],[1,2,0],[2,0,1]])
+	G.abeliano # Calcula es_grupo (y lo imprime) y si es abeliano
\ No newline at end of file